@@ -1,5 +1,15 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_save
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import signals
+        if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+            from rest_framework_simplejwt.token_blacklist.models import \
+                BlacklistedToken
+            post_save.connect(
+                signals.token_blacklisted, sender=BlacklistedToken
+            )
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+
+defaults = {
+    # Страховка от изменений в обход сигналов (queryset.update)
+    'TIMEOUT': 5 * 60,
+}
+
+# Поля пользователя, которые хранятся в кеше
+cached_fields = ('id', 'username', 'is_staff', 'is_active')
+
+
+def options():
+    return {**defaults, **getattr(settings, 'JWT_USER_CACHE', {})}
+
+
+def cache_key(user_id):
+    return f'jwt_user:{user_id}'
+
+
+def invalidate(user_id):
+    cache.delete(cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication без запроса пользователя к базе на каждый вызов.
+
+    В кеше лежат только id, username, is_staff и is_active. Остальные поля
+    пользователя отложены, как после ``.only()``, и загружаются из базы
+    при первом обращении. Кеш сбрасывается сигналами из ``api.signals``.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        fields = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in cached_fields
+        ]
+        key = cache_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            values = self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*fields).first()
+            if values is None:
+                raise AuthenticationFailed(
+                    _('User not found'), code='user_not_found'
+                )
+            cache.set(key, values, options()['TIMEOUT'])
+        user = self.user_model.from_db(
+            router.db_for_read(self.user_model), fields, values
+        )
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        return user
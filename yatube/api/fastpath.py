@@ -0,0 +1,170 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import (ManyRelatedField,
+                                      PrimaryKeyRelatedField,
+                                      SlugRelatedField)
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+defaults = {
+    'ENABLED': True,
+}
+
+# Поля, которым достаточно значения колонки из .values()
+plain_fields = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.IntegerField,
+)
+
+
+def options():
+    return {**defaults, **getattr(settings, 'API_FAST_READS', {})}
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, результат совпадает байт в байт.
+
+    Рассчитан на данные ``ValuesPlan``: строки, числа, списки и словари.
+    Если orjson не установлен или не справился с данными, работает
+    обычный JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (orjson is None or data is None or indent is not None
+                or self.ensure_ascii or not self.compact):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем разделители строк для JavaScript
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+def file_converter(field, model_field):
+    def convert(name):
+        return field.to_representation(
+            model_field.attr_class(None, model_field, name)
+        )
+    return convert
+
+
+class ValuesPlan:
+    """Представление сериализатора, собранное из строк ``.values()``.
+
+    Поддерживает простые поля модели, файлы, ``PrimaryKeyRelatedField``,
+    ``SlugRelatedField`` и списки ключей связи многие-ко-многим. Для
+    остальных полей ``build`` возвращает None.
+    """
+
+    def __init__(self, model, columns):
+        self.model = model
+        # (имя в ответе, ключ в .values() или поле многие-ко-многим,
+        # преобразование значения)
+        self.columns = columns
+
+    @classmethod
+    def build(cls, serializer):
+        model = serializer.Meta.model
+        columns = []
+        for field in serializer._readable_fields:
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if isinstance(field, ManyRelatedField):
+                child = field.child_relation
+                if not (model_field.many_to_many and model_field.concrete
+                        and isinstance(child, PrimaryKeyRelatedField)
+                        and child.pk_field is None):
+                    return None
+                columns.append((field.field_name, model_field, None))
+            elif model_field.is_relation:
+                if not model_field.concrete or model_field.many_to_many:
+                    return None
+                if isinstance(field, SlugRelatedField):
+                    key = f'{model_field.name}__{field.slug_field}'
+                elif (isinstance(field, PrimaryKeyRelatedField)
+                        and field.pk_field is None):
+                    key = model_field.attname
+                else:
+                    return None
+                columns.append((field.field_name, key, None))
+            elif isinstance(field, serializers.FileField):
+                columns.append((
+                    field.field_name, model_field.attname,
+                    file_converter(field, model_field),
+                ))
+            elif isinstance(field, plain_fields):
+                columns.append((
+                    field.field_name, model_field.attname,
+                    field.to_representation,
+                ))
+            else:
+                return None
+        return cls(model, columns)
+
+    @property
+    def pk(self):
+        return self.model._meta.pk.attname
+
+    def values(self, queryset, extra=()):
+        """Queryset строк со всеми нужными плану колонками."""
+        keys = {self.pk, *extra}
+        keys.update(
+            key for _, key, _ in self.columns if isinstance(key, str)
+        )
+        return queryset.prefetch_related(None).values(*keys)
+
+    def related_keys(self, model_field, pks):
+        result = {pk: [] for pk in pks}
+        if not pks:
+            return result
+        # Порядок тот же, что у prefetch_related: сортировка связанной модели
+        lookup = model_field.related_query_name()
+        pairs = model_field.related_model._default_manager.filter(
+            **{f'{lookup}__in': pks}
+        ).values_list(lookup, 'pk')
+        for owner, pk in pairs:
+            result[owner].append(pk)
+        return result
+
+    def serialize(self, rows):
+        rows = list(rows)
+        pks = [row[self.pk] for row in rows]
+        related = {
+            name: self.related_keys(key, pks)
+            for name, key, _ in self.columns if not isinstance(key, str)
+        }
+        result = []
+        for row in rows:
+            item = {}
+            for name, key, convert in self.columns:
+                if name in related:
+                    item[name] = related[name][row[self.pk]]
+                    continue
+                value = row[key]
+                if value is not None and convert is not None:
+                    value = convert(value)
+                item[name] = value
+            result.append(item)
+        return result
+
+    def instance(self, row, db):
+        """Объект модели с загруженными колонками для проверки прав."""
+        names = [
+            field.attname for field in self.model._meta.concrete_fields
+            if field.attname in row
+        ]
+        return self.model.from_db(db, names, [row[name] for name in names])
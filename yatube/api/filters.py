@@ -0,0 +1,33 @@
+from django.template import loader
+from rest_framework.filters import SearchFilter
+
+from posts.search import search_filter
+
+
+class FullTextSearchFilter(SearchFilter):
+    """SearchFilter, который ищет по полнотекстовому индексу.
+
+    Вид документов задается атрибутом ``search_kind`` у view.
+    """
+
+    def get_search_kind(self, view):
+        return getattr(view, 'search_kind', None)
+
+    def filter_queryset(self, request, queryset, view):
+        kind = self.get_search_kind(view)
+        terms = ' '.join(self.get_search_terms(request))
+        if kind is None:
+            return super().filter_queryset(request, queryset, view)
+        if not terms:
+            return queryset
+        return search_filter(kind, queryset, terms)
+
+    def to_html(self, request, queryset, view):
+        if self.get_search_kind(view) is None:
+            return super().to_html(request, queryset, view)
+        terms = self.get_search_terms(request)
+        context = {
+            'param': self.search_param,
+            'term': terms[0] if terms else '',
+        }
+        return loader.get_template(self.template).render(context)
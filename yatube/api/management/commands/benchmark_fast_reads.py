@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory, override_settings
+
+from api.views import CommentViewSet, GroupViewSet, PostViewSet
+from posts.models import Group, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость чтения API через сериализаторы и через '
+        '.values(), проверяя, что ответы совпадают'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз выполнить каждый запрос',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Размер страницы списков',
+        )
+
+    def get_cases(self, limit):
+        post = Post.objects.annotate(
+            total=Count('comments')
+        ).order_by('-total').first()
+        group = Group.objects.first()
+        if post is None or group is None:
+            raise CommandError('Для сравнения нужны посты и группы в базе')
+        params = {'limit': limit}
+        return [
+            ('posts', PostViewSet, 'list', params, {}),
+            ('posts ?expand', PostViewSet, 'list',
+             {**params, 'expand': 'text,text_html,views'}, {}),
+            ('post', PostViewSet, 'retrieve', {}, {'pk': post.pk}),
+            ('groups', GroupViewSet, 'list', params, {}),
+            ('group', GroupViewSet, 'retrieve', {}, {'pk': group.pk}),
+            ('comments', CommentViewSet, 'list', params,
+             {'post_id': post.pk}),
+        ]
+
+    def measure(self, view, params, kwargs, repeat):
+        timings = []
+        for _ in range(repeat):
+            request = RequestFactory().get('/', params)
+            start = time.perf_counter()
+            response = view(request, **kwargs)
+            response.render()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings), response.content
+
+    def handle(self, *args, **options):
+        for name, viewset, action, params, kwargs in self.get_cases(
+            options['limit']
+        ):
+            view = viewset.as_view({'get': action})
+            with override_settings(API_FAST_READS={'ENABLED': False}):
+                slow, expected = self.measure(
+                    view, params, kwargs, options['repeat']
+                )
+            fast, content = self.measure(
+                view, params, kwargs, options['repeat']
+            )
+            if content != expected:
+                raise CommandError(f'{name}: ответы не совпадают')
+            self.stdout.write(
+                f'{name}: сериализатор {slow * 1000:.1f} мс, '
+                f'.values() {fast * 1000:.1f} мс, '
+                f'ускорение {slow / fast:.1f}x, {len(content)} байт'
+            )
@@ -0,0 +1,60 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Max
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class EstimatedCountPagination(LimitOffsetPagination):
+    """LimitOffsetPagination без точного COUNT(*) на больших таблицах.
+
+    Для запроса без фильтров общее число оценивается по MAX(id), для
+    отфильтрованных большой результат COUNT(*) кешируется.
+    """
+    estimate_threshold = 10000
+    count_cache_timeout = 60
+
+    def get_count(self, queryset):
+        if not queryset.query.where:
+            estimate = queryset.aggregate(estimate=Max('pk'))['estimate']
+            if estimate is None:
+                return 0
+            if estimate >= self.estimate_threshold:
+                return estimate
+            return super().get_count(queryset)
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        key = f'api:count:{digest}'
+        count = cache.get(key)
+        if count is None:
+            count = super().get_count(queryset)
+            if count >= self.estimate_threshold:
+                cache.set(key, count, self.count_cache_timeout)
+        return count
+
+
+class PostCursorPagination(CursorPagination):
+    ordering = '-pub_date'
+
+
+class CommentCursorPagination(CursorPagination):
+    ordering = '-created'
+
+
+class CursorOptInMixin:
+    """Включает курсорную пагинацию по ``?pagination=cursor``."""
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return params.get('pagination') == 'cursor' or 'cursor' in params
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
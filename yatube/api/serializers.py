@@ -1,24 +1,119 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.validators import UniqueTogetherValidator
 
 from posts.models import Comment, Follow, Group, Post, User
 
 
-class UserSerializer(serializers.ModelSerializer):
+def split_param(request, name):
+    value = request.query_params.get(name, '')
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class SparseFieldsetMixin:
+    """Поддержка ``?fields=`` и ``?expand=`` при чтении.
+
+    ``?fields=a,b`` оставляет только перечисленные поля, ``?expand=c``
+    добавляет поля из ``Meta.expandable_fields``, которые по умолчанию
+    не выводятся.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+        expandable = set(getattr(self.Meta, 'expandable_fields', ()))
+        expand = split_param(request, 'expand')
+        requested = split_param(request, 'fields')
+        for name in list(fields):
+            if requested:
+                keep = name in requested
+            else:
+                keep = name not in expandable
+            if not keep and name not in expand:
+                del fields[name]
+        return fields
+
+    def optimize_queryset(self, queryset, extra=()):
+        """Загружает только колонки и связи, нужные выводимым полям."""
+        model = queryset.model
+        only = {'pk', *extra}
+        select = set()
+        prefetch = []
+        for field in self.fields.values():
+            name = field.source.split('.')[0]
+            try:
+                model_field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Поле считается методом модели: неизвестно, что ему нужно
+                return queryset
+            if model_field.many_to_many:
+                related = model_field.related_model.objects.only('pk')
+                prefetch.append(Prefetch(name, queryset=related))
+            elif isinstance(field, serializers.SlugRelatedField):
+                select.add(name)
+                only.add(f'{name}__{field.slug_field}')
+            else:
+                only.add(name)
+        queryset = queryset.only(*only)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    password = serializers.CharField(
+        write_only=True, required=False, style={'input_type': 'password'}
+    )
 
     class Meta:
         model = User
-        fields = '__all__'
+        fields = (
+            'id', 'username', 'password', 'first_name', 'last_name',
+            'email', 'is_staff', 'is_active', 'is_superuser', 'date_joined',
+            'last_login', 'groups', 'user_permissions',
+        )
+        expandable_fields = ('groups', 'user_permissions')
+
+    def create(self, validated_data):
+        password = validated_data.pop('password', None)
+        user = super().create(validated_data)
+        user.set_password(password)
+        user.save(update_fields=['password'])
+        return user
+
+    def update(self, instance, validated_data):
+        password = validated_data.pop('password', None)
+        user = super().update(instance, validated_data)
+        if password is not None:
+            user.set_password(password)
+            user.save(update_fields=['password'])
+        return user
+
+
+class UserListSerializer(UserSerializer):
+    """Компактное представление пользователя для списков."""
+
+    class Meta(UserSerializer.Meta):
+        expandable_fields = (
+            'email', 'is_staff', 'is_active', 'is_superuser', 'date_joined',
+            'last_login', 'groups', 'user_permissions',
+        )
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Group
         fields = '__all__'
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username',
         default=serializers.CurrentUserDefault()
@@ -27,10 +122,10 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = '__all__'
+        exclude = ('text_plain', 'text_hash')
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username',
         default=serializers.CurrentUserDefault()
@@ -38,7 +133,20 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = '__all__'
+        exclude = ('text_plain', 'text_hash')
+
+
+class PostListSerializer(PostSerializer):
+    """Компактное представление поста для списков: без текста и просмотров.
+
+    Полный текст и остальные поля доступны через ``?expand=``.
+    """
+
+    class Meta(PostSerializer.Meta):
+        expandable_fields = (
+            'text', 'text_html', 'views', 'updated', 'image_width',
+            'image_height',
+        )
 
 
 class FollowingSerializer(serializers.ModelSerializer):
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import invalidate
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+def token_blacklisted(sender, instance, **kwargs):
+    """Подключается, только если установлен token_blacklist."""
+    user = instance.token.user
+    if user is not None:
+        invalidate(getattr(user, api_settings.USER_ID_FIELD))
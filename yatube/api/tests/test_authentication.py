@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import signals
+from api.authentication import CachedJWTAuthentication, cache_key
+from posts.models import User
+
+follow_url = '/api/v1/follow/'
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com'
+        )
+
+    def setUp(self):
+        cache.clear()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.request = APIRequestFactory().get(
+            follow_url, HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+    def authenticate(self):
+        return CachedJWTAuthentication().authenticate(self.request)[0]
+
+    def test_user_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.username, 'reader')
+        self.assertFalse(user.is_staff)
+        self.assertTrue(user.is_authenticated)
+
+    def test_other_fields_are_loaded_on_access(self):
+        user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'reader@example.com')
+
+    def test_authenticated_request_does_not_query_user(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(follow_url)
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get(follow_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(warm), len(cold) - 1)
+
+    def test_user_changes_invalidate_cache(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(cache_key(self.user.pk)))
+        self.assertEqual(self.client.get(follow_url).status_code, 401)
+        self.user.is_active = True
+        self.user.save()
+
+    def test_deleted_user_is_rejected(self):
+        user = User.objects.create_user(username='temporary')
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get(follow_url).status_code, 200)
+        user.delete()
+        self.assertEqual(self.client.get(follow_url).status_code, 401)
+
+    def test_blacklisted_token_invalidates_cache(self):
+        self.authenticate()
+        instance = mock.Mock()
+        instance.token.user = self.user
+        signals.token_blacklisted(sender=None, instance=instance)
+        self.assertIsNone(cache.get(cache_key(self.user.pk)))
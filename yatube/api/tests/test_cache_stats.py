@@ -0,0 +1,63 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from posts.models import User
+from yatube.cache import reset_cache_stats
+
+tiered_caches = {
+    'default': {
+        'BACKEND': 'yatube.cache.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'NAME': 'tiered', 'LOCAL_TIMEOUT': 60},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-shared',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-local',
+    },
+}
+
+
+@override_settings(CACHES=tiered_caches)
+class TieredCacheTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        reset_cache_stats()
+
+    def test_local_tier_serves_shared_values(self):
+        cache = caches['default']
+        caches['shared'].set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(cache.get('key'), 'value')
+        caches['local'].clear()
+        self.assertIsNone(cache.get('key'))
+
+    def test_incr_goes_to_shared_tier(self):
+        cache = caches['default']
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter'), 2)
+        self.assertEqual(caches['shared'].get('counter'), 2)
+        self.assertEqual(cache.get('counter'), 2)
+
+    def test_stats_endpoint(self):
+        cache = caches['default']
+        cache.set('key', 'value')
+        cache.get('key')
+        cache.get('missing')
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        stats = client.get('/api/v1/cache/stats/').json()['caches']['tiered']
+        self.assertEqual(stats['local_hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.assertEqual(
+            APIClient().get('/api/v1/cache/stats/').status_code, 401
+        )
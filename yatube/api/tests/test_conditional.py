@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Текст поста', author=self.admin, group=self.group
+        )
+        self.client = APIClient()
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_resources_return_304(self):
+        post_url = f'/api/v1/posts/{self.post.pk}/'
+        self.client.force_authenticate(self.admin)
+        for url in ('/api/v1/', '/api/v1/posts/', post_url,
+                    f'{post_url}comments/', '/api/v1/groups/',
+                    '/api/v1/follow/', '/api/v1/follow/posts/',
+                    '/api/v1/users/', '/api/v1/search/?q=текст'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                cached = self.revalidate(url, response)
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.content, b'')
+                self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_changes_produce_new_etag(self):
+        comments_url = f'/api/v1/posts/{self.post.pk}/comments/'
+        posts = self.client.get('/api/v1/posts/')
+        comments = self.client.get(comments_url)
+        self.assertTrue(posts.has_header('Last-Modified'))
+        Comment.objects.create(
+            post=self.post, author=self.admin, text='Комментарий'
+        )
+        self.assertEqual(self.revalidate(comments_url, comments).status_code,
+                         200)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertEqual(self.revalidate('/api/v1/posts/', posts).status_code,
+                         200)
+
+    def test_follow_changes_followed_posts(self):
+        author = User.objects.create_user(username='post_author')
+        self.client.force_authenticate(self.admin)
+        url = '/api/v1/follow/posts/'
+        response = self.client.get(url)
+        Follow.objects.create(user=self.admin, author=author)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        anonymous = self.client.get('/api/v1/posts/')
+        self.assertIn('Authorization', anonymous['Vary'])
+        self.assertNotIn('private', anonymous['Cache-Control'])
+        self.client.force_authenticate(self.admin)
+        authenticated = self.client.get('/api/v1/posts/')
+        self.assertNotEqual(anonymous['ETag'], authenticated['ETag'])
+        self.assertIn('private', authenticated['Cache-Control'])
+
+    def test_writes_have_no_validators(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/v1/posts/', {'text': 'Пост'})
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api import fastpath
+from posts.models import Comment, Group, Ip, Post, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# Символы, которые кодировщики JSON экранируют по-разному
+tricky_text = (
+    '<p>Привет, "мир" \\ 😀\n\t\x01\x1f\x7f'
+    '\u2028\u2029 &amp; </script></p>'
+)
+
+
+def make_gif():
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2), 'white').save(buffer, 'GIF')
+    return SimpleUploadedFile(
+        name='small.gif', content=buffer.getvalue(), content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FastReadsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='автор')
+        cls.group = Group.objects.create(
+            title='Группа "№1"', slug='test-slug', description=tricky_text,
+        )
+        cls.ip = Ip.objects.create(ip='127.0.0.1')
+        cls.post = Post.objects.create(
+            text=tricky_text, author=cls.author, group=cls.group,
+            image=make_gif(),
+        )
+        cls.post.views.add(cls.ip)
+        Post.objects.create(text='Без группы', author=cls.author)
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.author, text=tricky_text
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get_both(self, url, params=None):
+        fast = self.client.get(url, params)
+        with override_settings(API_FAST_READS={'ENABLED': False}):
+            cache.clear()
+            slow = self.client.get(url, params)
+        return fast, slow
+
+    def assert_identical(self, url, params=None):
+        fast, slow = self.get_both(url, params)
+        self.assertEqual(fast.status_code, slow.status_code)
+        self.assertEqual(fast['Content-Type'], slow['Content-Type'])
+        self.assertEqual(fast.content, slow.content)
+
+    def test_output_matches_serializers(self):
+        post_url = f'/api/v1/posts/{self.post.pk}/'
+        comments_url = f'{post_url}comments/'
+        cases = [
+            ('/api/v1/posts/', None),
+            ('/api/v1/posts/', {'expand': 'text,views,image_width'}),
+            ('/api/v1/posts/', {'fields': 'id,author,views'}),
+            ('/api/v1/posts/', {'pagination': 'cursor'}),
+            ('/api/v1/posts/', {'ordering': 'group', 'limit': 1}),
+            ('/api/v1/posts/', {'search': 'привет'}),
+            (post_url, None),
+            (post_url, {'fields': 'text,image'}),
+            ('/api/v1/posts/0/', None),
+            ('/api/v1/groups/', None),
+            (f'/api/v1/groups/{self.group.pk}/', None),
+            (comments_url, None),
+            (comments_url, {'pagination': 'cursor'}),
+            (f'{comments_url}{self.comment.pk}/', None),
+        ]
+        for url, params in cases:
+            with self.subTest(url=url, params=params):
+                self.assert_identical(url, params)
+
+    def test_output_matches_without_orjson(self):
+        with mock.patch.object(fastpath, 'orjson', None):
+            self.assert_identical('/api/v1/posts/', {'expand': 'text'})
+
+    def test_fast_path_uses_fewer_queries(self):
+        with CaptureQueriesContext(connection) as fast:
+            self.client.get('/api/v1/posts/', {'expand': 'views'})
+        with override_settings(API_FAST_READS={'ENABLED': False}):
+            with CaptureQueriesContext(connection) as slow:
+                self.client.get('/api/v1/posts/', {'expand': 'views'})
+        self.assertLessEqual(len(fast), len(slow))
+
+    def test_browsable_api_uses_serializers(self):
+        with mock.patch.object(fastpath.ValuesPlan, 'build') as build:
+            response = self.client.get(
+                '/api/v1/posts/', HTTP_ACCEPT='text/html'
+            )
+        self.assertEqual(response.status_code, 200)
+        build.assert_not_called()
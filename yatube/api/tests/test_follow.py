@@ -0,0 +1,58 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from posts.models import Follow, Group, Ip, Post, User
+
+follow_posts_url = '/api/v1/follow/posts/'
+
+
+class FollowPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='post_author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        cls.ip = Ip.objects.create(ip='127.0.0.1')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.follower)
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text='Пост №' + str(i), author=self.author, group=self.group
+            )
+            post.views.add(self.ip)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(follow_posts_url)
+        return response, len(queries)
+
+    def test_follow_posts_are_paginated(self):
+        self.create_posts(12)
+        response, _ = self.count_queries()
+        data = response.json()
+        self.assertEqual(len(data['results']), 10)
+        # Список просмотров выводится только по запросу
+        self.assertNotIn('views', data['results'][0])
+        expanded = self.client.get(follow_posts_url, {'expand': 'views'})
+        self.assertEqual(expanded.json()['results'][0]['views'], [self.ip.id])
+        next_page = self.client.get(data['next']).json()
+        self.assertEqual(len(next_page['results']), 2)
+
+    def test_follow_posts_query_count_is_bounded(self):
+        self.create_posts(1)
+        _, single = self.count_queries()
+        self.create_posts(9)
+        _, many = self.count_queries()
+        self.assertEqual(single, many)
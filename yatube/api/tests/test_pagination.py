@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.pagination import EstimatedCountPagination
+from posts.models import Comment, Post, User
+
+posts_url = '/api/v1/posts/'
+
+
+class PaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='post_author')
+        cls.posts = [
+            Post.objects.create(text='Пост №' + str(i), author=cls.user)
+            for i in range(13)
+        ]
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.user, text=str(i)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_offset_is_default(self):
+        response = self.client.get(posts_url)
+        self.assertEqual(response.json()['count'], 13)
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_cursor_pagination_opt_in(self):
+        response = self.client.get(posts_url, {'pagination': 'cursor'})
+        data = response.json()
+        self.assertNotIn('count', data)
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0]['id'], self.posts[-1].id)
+        data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [post.id for post in self.posts[2::-1]],
+        )
+        self.assertIsNone(data['next'])
+
+    def test_comments_cursor_pagination(self):
+        response = self.client.get(
+            f'{posts_url}{self.posts[0].id}/comments/',
+            {'pagination': 'cursor'},
+        )
+        self.assertEqual(
+            [comment['text'] for comment in response.json()['results']],
+            ['2', '1', '0'],
+        )
+
+    def test_estimated_count_on_large_table(self):
+        with mock.patch.object(
+            EstimatedCountPagination, 'estimate_threshold', 5
+        ):
+            response = self.client.get(posts_url)
+        self.assertEqual(response.json()['count'], self.posts[-1].id)
+
+    def test_large_filtered_count_is_cached(self):
+        with mock.patch.object(
+            EstimatedCountPagination, 'estimate_threshold', 5
+        ):
+            self.client.get(posts_url, {'search': 'Пост'})
+            Post.objects.create(text='Пост', author=self.user)
+            response = self.client.get(posts_url, {'search': 'Пост'})
+        self.assertEqual(response.json()['count'], 13)
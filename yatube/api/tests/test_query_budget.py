@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import urls
+from posts.models import Comment, Follow, Group, Ip, Post, User
+
+
+@override_settings(QUERY_BUDGETS={**settings.QUERY_BUDGETS, 'RAISE': True})
+class ApiQueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='post_author', password='password', is_staff=True
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        ip = Ip.objects.create(ip='127.0.0.1')
+        for i in range(12):
+            post = Post.objects.create(
+                text='Пост №' + str(i), author=cls.author, group=cls.group
+            )
+            post.views.add(ip)
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий'
+            )
+        cls.post = post
+        cls.follow = Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+        self.reader_client = APIClient()
+        self.reader_client.force_authenticate(self.reader)
+
+    def test_every_route_has_budget(self):
+        names = {
+            pattern.name
+            for pattern in urls.urlpatterns + urls.router.urls
+            if getattr(pattern, 'name', None)
+        }
+        for name in names:
+            with self.subTest(name=name):
+                self.assertIn(name, settings.QUERY_BUDGETS['VIEWS'])
+
+    def test_routes_within_budget(self):
+        post_url = f'/api/v1/posts/{self.post.id}/'
+        comments_url = f'{post_url}comments/'
+        comment = self.post.comments.first()
+        refresh = str(RefreshToken.for_user(self.author))
+        requests = (
+            ('get', '/api/v1/', self.client, None),
+            ('get', '/api/v1/posts/', self.client, None),
+            ('get', '/api/v1/posts/', self.client, {'pagination': 'cursor'}),
+            ('post', '/api/v1/posts/', self.author_client, {'text': 'Новый'}),
+            ('get', post_url, self.client, None),
+            ('patch', post_url, self.author_client, {'text': 'Изменен'}),
+            ('get', '/api/v1/groups/', self.client, None),
+            ('get', f'/api/v1/groups/{self.group.id}/', self.client, None),
+            ('get', '/api/v1/users/', self.author_client, None),
+            ('get', f'/api/v1/users/{self.reader.id}/', self.author_client,
+             None),
+            ('get', '/api/v1/follow/', self.reader_client, None),
+            ('get', f'/api/v1/follow/{self.follow.id}/', self.reader_client,
+             None),
+            ('get', '/api/v1/follow/posts/', self.reader_client, None),
+            ('get', comments_url, self.client, None),
+            ('post', comments_url, self.reader_client, {'text': 'Новый'}),
+            ('get', f'{comments_url}{comment.id}/', self.client, None),
+            ('delete', f'{comments_url}{comment.id}/', self.reader_client,
+             None),
+            ('get', '/api/v1/search/', self.client, {'q': 'Пост'}),
+            ('get', '/api/v1/cache/stats/', self.author_client, None),
+            ('get', '/api/v1/statistics/', self.author_client, {'days': 30}),
+            ('post', '/api/v1/jwt/create/', self.client,
+             {'username': 'post_author', 'password': 'password'}),
+            ('post', '/api/v1/jwt/refresh/', self.client,
+             {'refresh': refresh}),
+            ('post', '/api/v1/jwt/verify/', self.client, {'token': refresh}),
+            ('delete', post_url, self.author_client, None),
+        )
+        for method, url, client, data in requests:
+            with self.subTest(method=method, url=url):
+                response = getattr(client, method)(url, data)
+                self.assertLess(response.status_code, 400)
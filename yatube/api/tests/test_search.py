@@ -0,0 +1,45 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Post, User
+
+
+class ApiSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='posts_author')
+        cls.cat = Post.objects.create(text='Белый кот', author=cls.author)
+        cls.dog = Post.objects.create(text='Черный пес', author=cls.author)
+        cls.comment = Comment.objects.create(
+            post=cls.dog, author=cls.author, text='Хороший пес'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_search_endpoint(self):
+        response = self.client.get('/api/v1/search/', {'q': 'кот'})
+        self.assertEqual(
+            [post['id'] for post in response.data['results']], [self.cat.pk]
+        )
+        response = self.client.get(
+            '/api/v1/search/', {'q': 'пес', 'type': 'comment'}
+        )
+        self.assertEqual(
+            [comment['id'] for comment in response.data['results']],
+            [self.comment.pk],
+        )
+
+    def test_search_param_uses_index(self):
+        response = self.client.get('/api/v1/posts/', {'search': 'черн'})
+        self.assertEqual(
+            [post['id'] for post in response.data['results']], [self.dog.pk]
+        )
+        response = self.client.get(
+            f'/api/v1/posts/{self.dog.pk}/comments/', {'search': 'хорош'}
+        )
+        self.assertEqual(
+            [comment['id'] for comment in response.data['results']],
+            [self.comment.pk],
+        )
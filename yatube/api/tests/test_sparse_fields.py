@@ -0,0 +1,78 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from posts.models import Group, Ip, Post, User
+
+posts_url = '/api/v1/posts/'
+users_url = '/api/v1/users/'
+
+
+class SparseFieldsetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста', author=cls.admin, group=cls.group
+        )
+        cls.post.views.add(Ip.objects.create(ip='127.0.0.1'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_post_list_is_compact(self):
+        item = self.client.get(posts_url).json()['results'][0]
+        self.assertEqual(item['author'], 'admin')
+        self.assertEqual(item['excerpt'], 'Текст поста')
+        for name in ('text', 'text_html', 'views'):
+            self.assertNotIn(name, item)
+
+    def test_post_detail_has_all_fields(self):
+        item = self.client.get(f'{posts_url}{self.post.pk}/').json()
+        self.assertEqual(item['text'], 'Текст поста')
+        self.assertEqual(len(item['views']), 1)
+
+    def test_expand_adds_fields(self):
+        response = self.client.get(posts_url, {'expand': 'text,views'})
+        item = response.json()['results'][0]
+        self.assertEqual(item['text'], 'Текст поста')
+        self.assertEqual(len(item['views']), 1)
+
+    def test_fields_limit_output(self):
+        response = self.client.get(posts_url, {'fields': 'id,text'})
+        item = response.json()['results'][0]
+        self.assertEqual(item, {'id': self.post.pk, 'text': 'Текст поста'})
+
+    def test_unknown_fields_are_ignored(self):
+        response = self.client.get(posts_url, {'fields': 'id,unknown'})
+        self.assertEqual(response.json()['results'][0], {'id': self.post.pk})
+
+    def test_user_list_hides_private_fields(self):
+        item = self.client.get(users_url).json()['results'][0]
+        self.assertEqual(item['username'], 'admin')
+        for name in ('password', 'email', 'groups', 'user_permissions'):
+            self.assertNotIn(name, item)
+
+    def test_user_detail_never_shows_password(self):
+        item = self.client.get(
+            f'{users_url}{self.admin.pk}/', {'expand': 'password'}
+        ).json()
+        self.assertEqual(item['email'], 'admin@example.com')
+        self.assertNotIn('password', item)
+
+    def test_created_user_has_hashed_password(self):
+        response = self.client.post(
+            users_url, {'username': 'new_user', 'password': 'p@ssw0rd'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('password', response.json())
+        user = User.objects.get(username='new_user')
+        self.assertTrue(user.check_password('p@ssw0rd'))
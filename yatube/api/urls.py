@@ -6,10 +6,16 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 
-from .views import (CommentViewSet, FollowViewSet, GroupViewSet, PostViewSet,
-                    UserViewSet)
+from .views import (APIRootView, CacheStatsView, CommentViewSet,
+                    FollowViewSet, GroupViewSet, PostViewSet, SearchView,
+                    StatisticsView, UserViewSet)
 
-router = routers.DefaultRouter()
+
+class Router(routers.DefaultRouter):
+    APIRootView = APIRootView
+
+
+router = Router()
 router.register('posts', PostViewSet)
 router.register('groups', GroupViewSet)
 router.register('users', UserViewSet)
@@ -20,6 +26,9 @@ router.register(r'posts/(?P<post_id>\d+)/comments',
 
 urlpatterns = [
     path('v1/', include(router.urls)),
+    path('v1/search/', SearchView.as_view(), name='search'),
+    path('v1/cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path('v1/statistics/', StatisticsView.as_view(), name='statistics'),
     path(
         'v1/jwt/create/', TokenObtainPairView.as_view(),
         name='token_obtain_pair'
@@ -1,30 +1,227 @@
+from django.db import transaction
+from django.db.models import Max
 from django.shortcuts import get_object_or_404
-from rest_framework import permissions, viewsets, filters
+from django.utils.cache import get_conditional_response
+from rest_framework import (exceptions, filters, generics, permissions,
+                            routers, status, viewsets)
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from posts.models import Group, Post, User
+from posts import analytics, conditional, fragments
+from posts.models import Comment, Group, Post, User
+from posts.search import ranked, search_ids
+from yatube.cache import cache_stats
+from . import fastpath
+from .filters import FullTextSearchFilter
+from .pagination import (CommentCursorPagination, CursorOptInMixin,
+                         PostCursorPagination)
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (CommentSerializer, FollowSerializer, GroupSerializer,
-                          PostSerializer, UserSerializer)
+                          PostListSerializer, PostSerializer,
+                          UserListSerializer, UserSerializer)
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class AtomicWritesMixin:
+    """Выполняет изменяющие запросы в одной транзакции.
+
+    Вместе с записью атомарно обновляются счетчики ``UserStats``.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in permissions.SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class NotModified(exceptions.APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для GET-запросов и ответ 304.
+
+    ``get_validators`` дешево считает ``(etag, last_modified)`` по версиям
+    данных (``posts.conditional``) до выполнения запроса. Если он вернул
+    None, ETag считается по телу готового ответа: ответ формируется, но
+    не передается повторно.
+    """
+    validators = None
+
+    def get_scopes(self):
+        """Области данных, от которых зависит ответ, или None."""
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def get_validators(self):
+        scopes = self.get_scopes()
+        if scopes is None:
+            return None
+        request = self.request
+        parts = (
+            request.get_full_path(), request.accepted_media_type,
+            request.user.pk,
+        )
+        return conditional.validators(
+            scopes, parts, self.get_last_modified()
+        )
+
+    def is_conditional(self, request):
+        return (request.method in ('GET', 'HEAD')
+                and conditional.options()['ENABLED'])
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self.is_conditional(request):
+            return
+        self.validators = self.get_validators()
+        if self.validators and conditional.not_modified(
+            request, *self.validators
+        ):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=exc.status_code)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if not self.is_conditional(request):
+            return response
+        validators = self.validators
+        if validators is None and response.status_code == 200:
+            validators = (conditional.content_etag(
+                response.render().content
+            ), None)
+        if validators is not None and response.status_code in (200, 304):
+            conditional.set_validators(response, *validators)
+        conditional.patch_response(
+            response, ('Authorization',),
+            request.user.is_authenticated,
+        )
+        if self.validators is None and response.status_code == 200:
+            return get_conditional_response(
+                request, *validators, response=response
+            )
+        return response
+
+
+class SparseFieldsetViewMixin:
+    """Компактный сериализатор для списка и выборка только нужных колонок.
+
+    Поля задаются параметрами ``?fields=`` и ``?expand=``, см.
+    ``SparseFieldsetMixin``.
+    """
+    list_serializer_class = None
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.list_serializer_class is not None:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+        # Поля сортировки нужны курсорной пагинации
+        ordering = [name.lstrip('-') for name in self.ordering or ()]
+        return self.get_serializer().optimize_queryset(queryset, ordering)
+
+
+class FastReadMixin:
+    """list и retrieve без объектов модели и сериализатора.
+
+    Строки берутся из ``.values()`` и кодируются ``FastJSONRenderer``,
+    ответ совпадает с ответом сериализатора байт в байт. Если поля
+    сериализатора не поддерживаются или клиент ждет не JSON (браузерный
+    API), запрос обрабатывается обычным путем.
+    """
+
+    def get_values_plan(self):
+        if (not fastpath.options()['ENABLED']
+                or type(self.request.accepted_renderer) is not JSONRenderer):
+            return None
+        return fastpath.ValuesPlan.build(self.get_serializer())
+
+    def get_cursor_keys(self, queryset):
+        # Курсорная пагинация берет позицию из строки по полю сортировки
+        if not isinstance(self.paginator, CursorPagination):
+            return ()
+        ordering = self.paginator.get_ordering(self.request, queryset, self)
+        return [name.lstrip('-') for name in ordering]
+
+    def fast_response(self, data):
+        self.request.accepted_renderer = fastpath.FastJSONRenderer()
+        return data if isinstance(data, Response) else Response(data)
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = plan.values(queryset, self.get_cursor_keys(queryset))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return self.fast_response(plan.serialize(queryset))
+        return self.fast_response(
+            self.get_paginated_response(plan.serialize(page))
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is None:
+            return super().retrieve(request, *args, **kwargs)
+        queryset = plan.values(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = generics.get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, plan.instance(row, queryset.db))
+        return self.fast_response(plan.serialize([row])[0])
+
+
+class PostViewSet(ConditionalGetMixin, AtomicWritesMixin, FastReadMixin,
+                  SparseFieldsetViewMixin, CursorOptInMixin,
+                  viewsets.ModelViewSet):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
+    list_serializer_class = PostListSerializer
     permission_classes = [IsAuthorOrReadOnly]
+    cursor_pagination_class = PostCursorPagination
     filter_backends = (
-        filters.SearchFilter,
+        FullTextSearchFilter,
         filters.OrderingFilter
     )
-    search_fields = ('author__username', 'text', 'group__title')
+    search_kind = 'post'
     ordering_fields = ('pub_date', 'group')
+    ordering = ('-pub_date',)
+
+    def get_scopes(self):
+        if self.action == 'retrieve':
+            post_scope = fragments.post_scope(self.kwargs['pk'])
+            return [post_scope, conditional.users_scope]
+        return [conditional.feed_scope, conditional.users_scope]
+
+    def get_last_modified(self):
+        posts = Post.objects.all()
+        if self.action == 'retrieve':
+            posts = posts.filter(pk=self.kwargs['pk'])
+        return posts.aggregate(last=Max('pub_date'))['last']
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+class GroupViewSet(ConditionalGetMixin, FastReadMixin,
+                   SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
     filter_backends = (
@@ -35,27 +232,44 @@ class GroupViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ('title', 'id')
     ordering = ('title',)
 
+    def get_scopes(self):
+        return [fragments.groups_scope]
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, AtomicWritesMixin, FastReadMixin,
+                     SparseFieldsetViewMixin, CursorOptInMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthorOrReadOnly]
+    cursor_pagination_class = CommentCursorPagination
     filter_backends = (
-        filters.SearchFilter,
+        FullTextSearchFilter,
         filters.OrderingFilter
     )
-    search_fields = ('author__username', 'text')
+    search_kind = 'comment'
     ordering_fields = ('created',)
+    ordering = ('-created',)
 
     def get_queryset(self):
         post = get_object_or_404(Post, id=self.kwargs.get('post_id'))
-        return post.comments.all()
+        return post.comments.select_related('author')
+
+    def get_scopes(self):
+        post_scope = fragments.post_scope(self.kwargs.get('post_id'))
+        return [post_scope, conditional.users_scope]
+
+    def get_last_modified(self):
+        return Comment.objects.filter(
+            post_id=self.kwargs.get('post_id')
+        ).aggregate(last=Max('created'))['last']
 
     def perform_create(self, serializer):
         post = get_object_or_404(Post, id=self.kwargs.get('post_id'))
         serializer.save(author=self.request.user, post=post)
 
 
-class FollowViewSet(viewsets.ModelViewSet):
+class FollowViewSet(ConditionalGetMixin, AtomicWritesMixin,
+                    viewsets.ModelViewSet):
     serializer_class = FollowSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = (
@@ -69,21 +283,35 @@ class FollowViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return self.request.user.follower.all()
 
+    def get_scopes(self):
+        # Подписки пользователя меняют его author_scope
+        author_scope = conditional.author_scope(self.request.user.pk)
+        if self.action == 'recent_white_cats':
+            return [conditional.feed_scope, author_scope,
+                    conditional.users_scope]
+        return [author_scope, conditional.users_scope]
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     @action(detail=False, url_path='posts')
     def recent_white_cats(self, request):
-        posts = Post.objects.filter(
-            author__following__user=request.user
-        ).select_related('author')
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        context = self.get_serializer_context()
+        posts = PostListSerializer(context=context).optimize_queryset(
+            Post.objects.filter(author__following__user=request.user),
+            ('pub_date',),
+        )
+        paginator = PostCursorPagination()
+        page = paginator.paginate_queryset(posts, request)
+        serializer = PostListSerializer(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, SparseFieldsetViewMixin,
+                  viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    list_serializer_class = UserListSerializer
     permission_classes = [permissions.IsAdminUser]
     filter_backends = (
         filters.SearchFilter,
@@ -94,3 +322,61 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     ordering_fields = ('username', 'date_joined')
     ordering = ('-date_joined',)
+
+
+class SearchView(ConditionalGetMixin, generics.ListAPIView):
+    """Поиск постов (``?type=post``) или комментариев (``?type=comment``).
+
+    Результаты отсортированы по релевантности.
+    """
+    querysets = {'post': Post.objects.all(), 'comment': Comment.objects.all()}
+    serializers = {'post': PostListSerializer, 'comment': CommentSerializer}
+
+    def get_scopes(self):
+        return [conditional.feed_scope, conditional.users_scope]
+
+    def get_kind(self):
+        kind = self.request.query_params.get('type', 'post')
+        return kind if kind in self.querysets else 'post'
+
+    def get_serializer_class(self):
+        return self.serializers[self.get_kind()]
+
+    def get_queryset(self):
+        kind = self.get_kind()
+        query = self.request.query_params.get('q', '')
+        queryset = self.get_serializer().optimize_queryset(
+            self.querysets[kind].all()
+        )
+        return ranked(queryset, search_ids(kind, query))
+
+
+class CacheStatsView(ConditionalGetMixin, APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class StatisticsView(ConditionalGetMixin, APIView):
+    """Популярные адреса и статьи за ``?days=`` дней или ``?hours=`` часов."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        days, hours = analytics.parse_span(request.query_params)
+        report = analytics.report(days, hours)
+        span = {'hours': hours} if hours else {'days': days}
+        return Response({
+            **span,
+            'urls': [
+                {'url': url, 'hits': count} for url, count in report['urls']
+            ],
+            'posts': [
+                {'post': post_id, 'views': count}
+                for post_id, count in report['posts']
+            ],
+        })
+
+
+class APIRootView(ConditionalGetMixin, routers.APIRootView):
+    pass
@@ -1,11 +1,23 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post, Ip, PageHit
+from .models import Comment, Follow, Group, Post, Ip, PageHit, UserStats
+from .search import search_filter
 
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'group', 'author',)
-    search_fields = ('text',)
+class FullTextSearchMixin:
+    """Поиск в админке по полнотекстовому индексу вместо LIKE."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_filter(self.search_kind, queryset, search_term), False
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('pk', 'excerpt', 'pub_date', 'group', 'author',)
+    search_fields = ('text_plain',)
+    search_kind = 'post'
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
@@ -17,9 +29,10 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ('post', 'author', 'text', 'created')
-    search_fields = ('text',)
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('post', 'author', 'excerpt', 'created')
+    search_fields = ('text_plain',)
+    search_kind = 'comment'
     empty_value_display = '-пусто-'
 
 
@@ -34,9 +47,16 @@ class PageHitAdmin(admin.ModelAdmin):
     search_fields = ('url',)
 
 
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'followers', 'following', 'posts', 'comments')
+    search_fields = ('user__username',)
+    readonly_fields = ('followers', 'following', 'posts', 'comments')
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Ip)
 admin.site.register(PageHit, PageHitAdmin)
+admin.site.register(UserStats, UserStatsAdmin)
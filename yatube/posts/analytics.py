@@ -0,0 +1,188 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from yatube.routers import use_primary
+
+from .models import Event, EventCursor, HitRollup, Post, Rollup, ViewRollup
+
+defaults = {
+    # Почасовые счетчики нужны только для отчетов за последние часы,
+    # дневные уже содержат те же события
+    'HOURLY_RETENTION_DAYS': 2,
+    'DAILY_RETENTION_DAYS': 365,
+    # Обработанные события журнала хранятся для повторной свертки
+    'EVENT_RETENTION_DAYS': 7,
+    'CACHE_TIMEOUT': 60,
+    'TOP_LIMIT': 10,
+}
+
+
+def options():
+    return {**defaults, **getattr(settings, 'STATISTICS', {})}
+
+
+def hour_start(moment):
+    return timezone.localtime(moment).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+def day_start(moment):
+    return hour_start(moment).replace(hour=0)
+
+
+def increment(model, key, counts):
+    """Прибавляет ``counts[(period, start, key)]`` к счетчикам периодов.
+
+    Недостающие строки создаются с нулем, поэтому одновременная свертка
+    из другого процесса не приведет к двум строкам одного периода.
+    """
+    model.objects.bulk_create(
+        [model(period=period, start=start, **{key: value})
+         for period, start, value in counts],
+        ignore_conflicts=True,
+    )
+    rows = model.objects.filter(
+        start__in={start for _, start, _ in counts},
+        **{f'{key}__in': {value for _, _, value in counts}},
+    ).values_list('pk', 'period', 'start', key)
+    updates = defaultdict(list)
+    for pk, *bucket in rows:
+        amount = counts.get(tuple(bucket))
+        if amount:
+            updates[amount].append(pk)
+    for amount, pks in updates.items():
+        model.objects.filter(pk__in=pks).update(count=F('count') + amount)
+
+
+def aggregate(limit=10000):
+    """Добавляет новые события журнала в почасовые и дневные счетчики.
+
+    Возвращает число обработанных событий. Как и ``events.rollup``,
+    хранит свою позицию в ``EventCursor``.
+    """
+    with use_primary(), transaction.atomic():
+        cursor, _ = EventCursor.objects.select_for_update().get_or_create(
+            name=EventCursor.ROLLUPS
+        )
+        events = list(Event.objects.filter(
+            pk__gt=cursor.position
+        ).order_by('pk').values_list(
+            'pk', 'kind', 'url', 'post_id', 'weight', 'created'
+        )[:limit])
+        if not events:
+            return 0
+        hits = Counter()
+        views = Counter()
+        for _, kind, url, post_id, weight, created in events:
+            starts = (
+                (Rollup.HOUR, hour_start(created)),
+                (Rollup.DAY, day_start(created)),
+            )
+            for period, start in starts:
+                if kind == Event.HIT:
+                    hits[(period, start, url)] += weight
+                elif kind == Event.VIEW:
+                    views[(period, start, post_id)] += weight
+        posts = set(Post.objects.filter(
+            pk__in={post_id for _, _, post_id in views}
+        ).values_list('pk', flat=True))
+        views = Counter({
+            bucket: amount for bucket, amount in views.items()
+            if bucket[2] in posts
+        })
+        if hits:
+            increment(HitRollup, 'url', hits)
+        if views:
+            increment(ViewRollup, 'post_id', views)
+        cursor.position = events[-1][0]
+        cursor.save(update_fields=['position'])
+    return len(events)
+
+
+def compact(now=None):
+    """Удаляет устаревшие счетчики и обработанные события журнала.
+
+    Возвращает число удаленных строк по таблицам.
+    """
+    config = options()
+    now = now or timezone.now()
+    hourly_before = now - timedelta(days=config['HOURLY_RETENTION_DAYS'])
+    daily_before = now - timedelta(days=config['DAILY_RETENTION_DAYS'])
+    deleted = Counter()
+    with use_primary():
+        for model in (HitRollup, ViewRollup):
+            for period, before in ((Rollup.HOUR, hourly_before),
+                                   (Rollup.DAY, daily_before)):
+                _, counts = model.objects.filter(
+                    period=period, start__lt=before
+                ).delete()
+                deleted.update(counts)
+        # Событие удаляется, только когда его свернули все обработчики
+        positions = dict(EventCursor.objects.values_list(
+            'name', 'position'
+        ))
+        processed = min(positions.get(name, 0) for name in EventCursor.NAMES)
+        _, counts = Event.objects.filter(
+            pk__lte=processed,
+            created__lt=now - timedelta(days=config['EVENT_RETENTION_DAYS']),
+        ).delete()
+        deleted.update(counts)
+    return dict(deleted)
+
+
+def parse_span(params):
+    """``(days, hours)`` из параметров запроса в пределах хранения."""
+    config = options()
+
+    def number(name, maximum):
+        try:
+            value = int(params.get(name, ''))
+        except ValueError:
+            return None
+        return min(max(value, 1), maximum)
+    days = number('days', config['DAILY_RETENTION_DAYS']) or 7
+    hours = number('hours', config['HOURLY_RETENTION_DAYS'] * 24)
+    return days, hours
+
+
+def top(model, key, period, since, limit):
+    return list(model.objects.filter(
+        period=period, start__gte=since
+    ).values_list(key).annotate(
+        total=Sum('count')
+    ).order_by('-total', key)[:limit])
+
+
+def report(days=None, hours=None, limit=None):
+    """Самые посещаемые адреса и статьи за ``days`` дней или ``hours`` часов.
+
+    Считается по дневным (или почасовым) счетчикам, поэтому время не
+    зависит от числа событий. Возвращает ``{'urls': [(url, count)],
+    'posts': [(post_id, count)]}``.
+    """
+    config = options()
+    limit = limit or config['TOP_LIMIT']
+    now = timezone.now()
+    if hours is not None:
+        period, since = Rollup.HOUR, hour_start(now) - timedelta(
+            hours=hours - 1
+        )
+    else:
+        period, since = Rollup.DAY, day_start(now) - timedelta(
+            days=(days or 1) - 1
+        )
+    key = f'statistics:{period}:{since.isoformat()}:{limit}'
+
+    def build():
+        return {
+            'urls': top(HitRollup, 'url', period, since, limit),
+            'posts': top(ViewRollup, 'post_id', period, since, limit),
+        }
+    return cache.get_or_set(key, build, config['CACHE_TIMEOUT'])
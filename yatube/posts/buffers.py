@@ -0,0 +1,322 @@
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.models import F
+
+from yatube.routers import use_primary
+
+from . import conditional
+from .models import Ip, PageHit, Post, User
+
+logger = logging.getLogger(__name__)
+
+
+def increment(key, amount=1):
+    """Атомарно прибавляет ``amount`` к числу в кеше.
+
+    Возвращает новое значение и то, создан ли ключ. ``ValueError``
+    значит, что ключ вытесняется быстрее, чем его удается увеличить.
+    """
+    for _ in range(3):
+        if cache.add(key, amount, timeout=None):
+            return amount, True
+        try:
+            return cache.incr(key, amount), False
+        except ValueError:
+            # Ключ вытеснен между add и incr
+            continue
+    raise ValueError(key)
+
+
+def take(key, value):
+    """Вычитает из счетчика в кеше прочитанное значение ``value``.
+
+    Возвращает, сколько удалось забрать: если часть уже забрал
+    одновременный сброс, лишнее возвращается в счетчик.
+    """
+    if not value or value < 0:
+        return 0
+    try:
+        left = cache.decr(key, value)
+    except ValueError:
+        return 0
+    if left < 0:
+        try:
+            cache.incr(key, -left)
+        except ValueError:
+            pass
+        value += left
+    return max(value, 0)
+
+
+class WriteBehindBuffer:
+    """Копит инкременты счётчиков в памяти и сбрасывает их пачкой.
+
+    Сброс происходит, когда накопилось ``FLUSH_SIZE`` инкрементов или с
+    прошлого сброса прошло ``FLUSH_INTERVAL`` секунд. При ``BACKEND =
+    'cache'`` счётчики живут в общем кеше, и сбросить их может любой
+    воркер или management-команда.
+    """
+    settings_name = None
+    cache_prefix = None
+    defaults = {
+        'BACKEND': 'memory',
+        'FLUSH_INTERVAL': 10,
+        'FLUSH_SIZE': 100,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def options(self):
+        return {**self.defaults, **getattr(settings, self.settings_name, {})}
+
+    @property
+    def generation_key(self):
+        return f'{self.cache_prefix}:generation'
+
+    def generation_prefix(self, generation):
+        return f'{self.cache_prefix}:{generation}'
+
+    def cache_key(self, key):
+        digest = hashlib.md5(repr(key).encode()).hexdigest()
+        return f'{self.cache_prefix}:{digest}'
+
+    def add(self, key, amount=1):
+        options = self.options
+        with self._lock:
+            if options['BACKEND'] == 'cache':
+                self._add_to_cache(key, amount)
+            else:
+                self._pending[key] += amount
+            self._size += amount
+            due = (
+                self._size >= options['FLUSH_SIZE']
+                or time.monotonic() - self._last_flush
+                >= options['FLUSH_INTERVAL']
+            )
+        if due:
+            self.flush()
+
+    def _add_to_cache(self, key, amount):
+        """Прибавляет ``amount`` к счетчику в кеше текущего поколения.
+
+        Новый счетчик записывается в реестр поколения отдельным слотом,
+        номер которого выдает атомарный ``incr``, поэтому процессы не
+        затирают записи друг друга. Если кеш недоступен или вытесняет
+        ключи, инкремент остается в памяти процесса.
+        """
+        prefix = self.generation_prefix(cache.get(self.generation_key, 0))
+        cache_key = f'{prefix}:{self.cache_key(key)}'
+        try:
+            _, created = increment(cache_key, amount)
+            if created:
+                slot, _ = increment(f'{prefix}:slots')
+                cache.set(
+                    f'{prefix}:slot:{slot}', (cache_key, key), timeout=None
+                )
+        except ValueError:
+            self._pending[key] += amount
+
+    def _drain_generation(self, generation, delete):
+        prefix = self.generation_prefix(generation)
+        slots = cache.get(f'{prefix}:slots', 0)
+        entries = cache.get_many(
+            [f'{prefix}:slot:{slot}' for slot in range(1, slots + 1)]
+        )
+        keys = dict(entries.values())
+        pending = Counter()
+        for cache_key, value in cache.get_many(list(keys)).items():
+            taken = take(cache_key, value)
+            if taken:
+                pending[keys[cache_key]] += taken
+        if delete:
+            cache.delete_many([*keys, *entries, f'{prefix}:slots'])
+        return pending
+
+    def _drain_cache(self):
+        """Забирает счетчики из кеша, начиная новое поколение ключей.
+
+        Только что закрытое поколение забирается целиком. Предыдущее
+        забирается еще раз (на случай записей, начатых до прошлого
+        сброса) и удаляется, поэтому кеш и реестр не растут.
+        """
+        if cache.add(self.generation_key, 1, timeout=None):
+            generation = 1
+        else:
+            try:
+                generation = cache.incr(self.generation_key)
+            except ValueError:
+                return Counter()
+        pending = Counter()
+        for closed in (generation - 2, generation - 1):
+            if closed >= 0:
+                pending.update(self._drain_generation(
+                    closed, delete=closed == generation - 2
+                ))
+        return pending
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            if self.options['BACKEND'] == 'cache':
+                pending.update(self._drain_cache())
+            self._size = 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            # Сброс может случиться посреди чужого GET-запроса
+            with use_primary():
+                self.write(pending)
+        except DatabaseError:
+            logger.exception('Не удалось сбросить буфер %s', self.cache_prefix)
+            with self._lock:
+                self._pending.update(pending)
+                self._size += sum(pending.values())
+            return 0
+        return sum(pending.values())
+
+    def write(self, pending):
+        raise NotImplementedError
+
+
+class PageHitBuffer(WriteBehindBuffer):
+    settings_name = 'PAGE_HITS'
+    cache_prefix = 'page_hits'
+
+    def write(self, pending):
+        clients = set(User.objects.filter(
+            pk__in={client for client, _ in pending}
+        ).values_list('pk', flat=True))
+        pending = {
+            key: amount for key, amount in pending.items()
+            if key[0] in clients
+        }
+        urls = {url for _, url in pending}
+        with transaction.atomic():
+            # Строки создаются с нулевым счётчиком: если другой процесс уже
+            # создал такую же, уникальный индекс просто отбросит вставку
+            PageHit.objects.bulk_create(
+                [PageHit(client_id=client, url=url)
+                 for client, url in pending],
+                ignore_conflicts=True,
+            )
+            hits = PageHit.objects.filter(
+                client__in=clients, url__in=urls
+            ).values_list('pk', 'client_id', 'url')
+            updates = defaultdict(list)
+            for pk, client, url in hits:
+                amount = pending.get((client, url))
+                if amount:
+                    updates[amount].append(pk)
+            for amount, pks in updates.items():
+                PageHit.objects.filter(pk__in=pks).update(
+                    count=F('count') + amount
+                )
+
+
+class PostViewBuffer(WriteBehindBuffer):
+    """Копит уникальные просмотры постов по ip.
+
+    Повторные просмотры отсекаются ещё до буфера по ключу в кеше с
+    временем жизни ``DEDUP_TTL``, а при сбросе - по уже записанным
+    строкам связующей таблицы ``Post.views``.
+    """
+    settings_name = 'POST_VIEWS'
+    cache_prefix = 'post_views'
+    defaults = {
+        **WriteBehindBuffer.defaults,
+        'DEDUP_TTL': 60 * 60,
+    }
+
+    def seen_key(self, post_id, ip):
+        return f'{self.cache_key((post_id, ip))}:seen'
+
+    def is_new(self, post_id, ip):
+        """Первый ли это просмотр поста с ip за ``DEDUP_TTL`` секунд."""
+        return cache.add(
+            self.seen_key(post_id, ip), 1, timeout=self.options['DEDUP_TTL']
+        )
+
+    def forget(self, post_id, ip):
+        """Просмотр не учтен: следующий с того же ip снова будет новым."""
+        cache.delete(self.seen_key(post_id, ip))
+
+    def record(self, post_id, ip):
+        if self.is_new(post_id, ip):
+            self.add((post_id, ip))
+
+    def write(self, pending):
+        Through = Post.views.through
+        ips = {ip for _, ip in pending}
+        with transaction.atomic():
+            # Блокировка постов выстраивает сбросы одних и тех же постов в
+            # очередь, и existing ниже не устаревает до вставки
+            posts = set(Post.objects.select_for_update().filter(
+                pk__in={post for post, _ in pending}
+            ).order_by('pk').values_list('pk', flat=True))
+            known = dict(
+                Ip.objects.filter(ip__in=ips).values_list('ip', 'pk')
+            )
+            if ips - known.keys():
+                Ip.objects.bulk_create(
+                    (Ip(ip=ip) for ip in ips - known.keys()),
+                    ignore_conflicts=True,
+                )
+                known = dict(
+                    Ip.objects.filter(ip__in=ips).values_list('ip', 'pk')
+                )
+            existing = set(Through.objects.filter(
+                post__in=posts, ip__ip__in=ips
+            ).values_list('post_id', 'ip__ip'))
+            created = {
+                (post, ip) for post, ip in pending
+                if post in posts and (post, ip) not in existing
+            }
+            # Пару мог записать и не буфер (например, админка): счетчик
+            # увеличивается только за действительно вставленные строки
+            Through.objects.bulk_create(
+                (Through(post_id=post, ip_id=known[ip])
+                 for post, ip in created),
+                ignore_conflicts=True,
+            )
+            created &= set(Through.objects.filter(
+                post__in=posts, ip__ip__in=ips
+            ).values_list('post_id', 'ip__ip')) - existing
+            updates = defaultdict(list)
+            for post, amount in Counter(
+                post for post, _ in created
+            ).items():
+                updates[amount].append(post)
+            for amount, pks in updates.items():
+                Post.objects.filter(pk__in=pks).update(
+                    view_count=F('view_count') + amount
+                )
+        # Счетчики просмотров выводятся на страницах постов и в лентах
+        conditional.touch_posts({post for post, _ in created})
+
+
+page_hits = PageHitBuffer()
+post_views = PostViewBuffer()
+
+buffers = [page_hits, post_views]
+
+
+def flush_all():
+    return sum(buffer.flush() for buffer in buffers)
+
+
+def register_shutdown_flush():
+    atexit.register(flush_all)
@@ -0,0 +1,227 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from . import fragments
+from .models import Group, Post, User
+
+defaults = {
+    'ENABLED': True,
+    # Меняйте при выкладке: ETag зависит и от шаблонов
+    'VERSION': '',
+}
+
+feed_scope = 'feed'
+users_scope = 'users'
+
+# Шаблоны могли измениться при перезапуске, поэтому Last-Modified не
+# бывает раньше запуска процесса
+started = time.time()
+
+
+def options():
+    return {**defaults, **getattr(settings, 'CONDITIONAL_GET', {})}
+
+
+def author_scope(user_id):
+    return f'author:{user_id}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def modified_key(scope):
+    return f'modified:{scope}'
+
+
+def touch(*scopes):
+    """Отмечает изменение данных: новая версия и время изменения."""
+    now = time.time()
+    for scope in scopes:
+        fragments.bump_version(scope)
+    cache.set_many(
+        {modified_key(scope): now for scope in scopes}, timeout=None
+    )
+
+
+def post_scopes(post_id, author_id, group_id=None):
+    scopes = [feed_scope, fragments.post_scope(post_id),
+              author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def touch_post(post_id, author_id, group_id=None):
+    """Пост изменился: ленты, страница поста и карточка устарели."""
+    touch(*post_scopes(post_id, author_id, group_id))
+
+
+def touch_posts(post_ids):
+    scopes = set()
+    rows = Post.objects.filter(pk__in=list(post_ids)).values_list(
+        'pk', 'author_id', 'group_id'
+    )
+    for row in rows:
+        scopes.update(post_scopes(*row))
+    if scopes:
+        touch(*scopes)
+
+
+def scope_state(scopes):
+    """Версии областей и время последнего изменения любой из них."""
+    version_keys = [fragments.version_key(scope) for scope in scopes]
+    modified_keys = [modified_key(scope) for scope in scopes]
+    values = cache.get_many(version_keys + modified_keys)
+    missing = [key for key in modified_keys if key not in values]
+    now = time.time()
+    if missing:
+        # Время изменения вытеснено из кеша: считаем, что изменение было
+        # только что, иначе клиент мог бы получить устаревшую страницу
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        values.update(cache.get_many(missing))
+    versions = [values.get(key, 0) for key in version_keys]
+    modified = max(values.get(key, now) for key in modified_keys)
+    return versions, modified
+
+
+def validators(scopes, parts, last_modified=None):
+    """``(etag, last_modified)`` ресурса без выполнения view.
+
+    ``scopes`` - области, изменение которых меняет ответ, ``parts`` -
+    остальное, от чего он зависит (адрес, пользователь), а
+    ``last_modified`` - время самой свежей записи (max ``pub_date`` или
+    ``created``), если оно известно.
+    """
+    versions, modified = scope_state(scopes)
+    if last_modified is not None:
+        modified = max(modified, last_modified.timestamp())
+    digest = hashlib.md5(repr((
+        options()['VERSION'], scopes, versions, modified, parts,
+    )).encode()).hexdigest()
+    return quote_etag(digest), int(max(modified, started))
+
+
+def content_etag(content):
+    """ETag по телу готового ответа, когда дешевых валидаторов нет."""
+    return quote_etag(hashlib.md5(content).hexdigest())
+
+
+def not_modified(request, etag, last_modified):
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    ) is not None
+
+
+def set_validators(response, etag, last_modified=None):
+    response.setdefault('ETag', etag)
+    if last_modified is not None:
+        response.setdefault('Last-Modified', http_date(last_modified))
+
+
+def patch_response(response, vary, private):
+    """Ответ можно хранить, но перед использованием нужно проверить.
+
+    Ответы для вошедшего пользователя не попадают в общий кеш прокси.
+    """
+    patch_vary_headers(response, vary)
+    if private:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+
+
+def recent_posts_key(user_id):
+    return f'recent_posts:{user_id}'
+
+
+def recent_post_count(user_id):
+    """Сколько постов пользователь опубликовал за последний час.
+
+    Время публикации его недавних постов хранится в кеше и сбрасывается
+    сигналами при создании и удалении поста, поэтому на каждую страницу
+    запрос не нужен.
+    """
+    key = recent_posts_key(user_id)
+    since = timezone.now() - timedelta(hours=1)
+    dates = cache.get(key)
+    if dates is None:
+        dates = list(Post.objects.filter(
+            author=user_id, pub_date__gte=since
+        ).values_list('pub_date', flat=True))
+        cache.set(key, dates, timeout=None)
+    return sum(date >= since for date in dates)
+
+
+def forget_recent_posts(user_id):
+    cache.delete(recent_posts_key(user_id))
+
+
+def viewer_parts(request):
+    """Часть ключа страницы, зависящая от пользователя."""
+    user = request.user
+    if not user.is_authenticated:
+        return ('anonymous',)
+    # Кнопка редактирования у своих постов пропадает через час после
+    # публикации, без изменения данных
+    recent = recent_post_count(user.pk)
+    # Формы страницы содержат csrf-токен: cookie создается уже при первом
+    # ответе, чтобы ETag не менялся при следующем запросе
+    get_token(request)
+    return user.pk, recent, request.META['CSRF_COOKIE']
+
+
+def page_validators(request, scopes, last_modified=None):
+    # Формы в шаблонах выводят список групп, а карточки - имена авторов
+    scopes = [*scopes, fragments.groups_scope, users_scope]
+    parts = (request.get_full_path(), viewer_parts(request))
+    return validators(scopes, parts, last_modified)
+
+
+def index_validators(request):
+    last = Post.objects.aggregate(last=Max('pub_date'))['last']
+    return page_validators(request, [feed_scope], last)
+
+
+def group_validators(request, slug):
+    row = Group.objects.filter(slug=slug).annotate(
+        last=Max('group_posts__pub_date')
+    ).values_list('pk', 'last').first()
+    if row is None:
+        return None
+    return page_validators(request, [group_scope(row[0])], row[1])
+
+
+def profile_validators(request, username):
+    row = User.objects.filter(username=username).annotate(
+        last=Max('posts__pub_date')
+    ).values_list('pk', 'last').first()
+    if row is None:
+        return None
+    return page_validators(request, [author_scope(row[0])], row[1])
+
+
+def post_validators(request, username, post_id):
+    row = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).annotate(
+        last=Max('comments__created')
+    ).values_list('author_id', 'pub_date', 'last').first()
+    if row is None:
+        return None
+    author_id, pub_date, last_comment = row
+    scopes = [fragments.post_scope(post_id), author_scope(author_id)]
+    return page_validators(
+        request, scopes, max(filter(None, (pub_date, last_comment)))
+    )
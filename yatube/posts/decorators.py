@@ -1,19 +1,108 @@
+import hashlib
 from functools import wraps
-from django.db.models import F
-from django.db import transaction
 
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+
+from . import conditional, events
 from .models import PageHit
 
+url_max_length = PageHit._meta.get_field('url').max_length
+
+
+def get_client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(',')[0]
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    return ip
+
 
 def counted(f):
     @wraps(f)
     def decorator(request, *args, **kwargs):
-        with transaction.atomic():
-            if request.user.is_authenticated:
-                counter, created = PageHit.objects.get_or_create(
-                    client=request.user, url=request.path
-                )
-                counter.count = F('count') + 1
-                counter.save()
+        if request.user.is_authenticated:
+            events.record_hit(
+                request.user.pk, request.path[:url_max_length]
+            )
         return f(request, *args, **kwargs)
     return decorator
+
+
+def cache_per_session(timeout):
+    """Кеширует страницу отдельно для каждой сессии пользователя.
+
+    В отличие от ``cache_page`` ключ не зависит от остальных cookie, а
+    csrf-токен в закешированной странице остаётся действительным, пока
+    не сменилась сессия. Под ``conditional_page`` валидаторы сохраняются
+    вместе со страницей: закешированная копия отдается со своим ETag.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(request, *args, **kwargs):
+            session_key = ''
+            if request.user.is_authenticated:
+                session_key = request.session.session_key
+            if request.method != 'GET' or session_key is None:
+                return f(request, *args, **kwargs)
+            digest = hashlib.md5(
+                f'{request.get_full_path()}|{session_key}'.encode()
+            ).hexdigest()
+            key = f'page:{f.__name__}:{digest}'
+            response = cache.get(key)
+            if response is None:
+                response = f(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    validators = getattr(request, 'validators', None)
+                    if validators is not None:
+                        conditional.set_validators(response, *validators)
+                    cache.set(key, response, timeout)
+            patch_vary_headers(response, ('Cookie',))
+            if session_key:
+                patch_cache_control(response, private=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(get_validators):
+    """Отвечает 304, если страница не изменилась с прошлого запроса.
+
+    ``get_validators`` получает аргументы view и дешево, без запроса
+    данных страницы, считает ``(etag, last_modified)`` (см.
+    ``posts.conditional``) или возвращает None, если ресурса нет.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or not conditional.options()['ENABLED']):
+                return f(request, *args, **kwargs)
+            validators = get_validators(request, *args, **kwargs)
+            if validators is None:
+                return f(request, *args, **kwargs)
+            request.validators = validators
+            response = get_conditional_response(request, *validators)
+            if response is None:
+                response = f(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                conditional.set_validators(response, *validators)
+            conditional.patch_response(
+                response, ('Cookie',), request.user.is_authenticated
+            )
+            return response
+        return wrapper
+    return decorator
+
+
+def records_post_view(f):
+    """Учитывает просмотр поста, в том числе ответом 304."""
+    @wraps(f)
+    def wrapper(request, username, post_id):
+        response = f(request, username, post_id)
+        if response.status_code in (200, 304):
+            events.record_view(post_id, get_client_ip(request))
+        return response
+    return wrapper
@@ -0,0 +1,227 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from yatube.routers import use_primary
+
+from . import analytics
+from .buffers import page_hits, post_views
+from .models import Event, EventCursor
+
+logger = logging.getLogger(__name__)
+
+defaults = {
+    'ENABLED': True,
+    # Фоновый поток пишет журнал; без него пачка пишется в запросе,
+    # который ее заполнил
+    'ASYNC': True,
+    'QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    # Сколько секунд поток ждет, пока наберется пачка
+    'FLUSH_INTERVAL': 2,
+    'ROLLUP_INTERVAL': 10,
+    # Что делать при заполнении очереди: 'drop' - отбрасывать новые
+    # события, 'sample' - начиная с SAMPLE_FROM заполнения оставлять
+    # каждое SAMPLE_EVERY-е событие с весом SAMPLE_EVERY. Просмотры
+    # уникальны по ip и в выборку не попадают
+    'OVERFLOW': 'sample',
+    'SAMPLE_FROM': 0.8,
+    'SAMPLE_EVERY': 10,
+}
+
+
+def options():
+    return {**defaults, **getattr(settings, 'ANALYTICS_EVENTS', {})}
+
+
+class EventPipeline:
+    """Очередь событий аналитики в памяти процесса.
+
+    Запрос только кладет событие в ограниченную очередь, фоновый поток
+    пачками пишет их в журнал ``Event``, а ``rollup`` и
+    ``analytics.aggregate`` переносят журнал в счетчики. Отброшенные при
+    переполнении события учитываются в ``stats()``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._counters = Counter()
+        self._sampled = 0
+        self._last_rollup = time.monotonic()
+
+    @property
+    def queue(self):
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue(maxsize=options()['QUEUE_SIZE'])
+            return self._queue
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['pending'] = self.queue.qsize()
+        return stats
+
+    def emit(self, kind, **fields):
+        """Ставит событие в очередь после коммита транзакции запроса."""
+        event = Event(kind=kind, created=timezone.now(), **fields)
+        transaction.on_commit(lambda: self.put(event))
+
+    def put(self, event):
+        config = options()
+        events = self.queue
+        is_view = event.kind == Event.VIEW
+        if (config['OVERFLOW'] == 'sample' and not is_view
+                and events.qsize() >= config['SAMPLE_FROM'] * events.maxsize):
+            with self._lock:
+                self._sampled += 1
+                keep = self._sampled % config['SAMPLE_EVERY'] == 0
+            if not keep:
+                self.count('sampled')
+                return
+            event.weight = config['SAMPLE_EVERY']
+        # Повторный просмотр отсекается только для принятого события:
+        # отброшенный не должен закрывать учет просмотров с этого ip
+        if is_view and not post_views.is_new(event.post_id, event.ip):
+            return
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            if is_view:
+                post_views.forget(event.post_id, event.ip)
+            self.count('dropped')
+            return
+        self.count('queued')
+        if config['ASYNC']:
+            self.ensure_worker()
+        elif events.qsize() >= config['BATCH_SIZE']:
+            self.flush()
+
+    def ensure_worker(self):
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self.run, name='analytics-events', daemon=True
+            )
+            self._worker.start()
+
+    def take(self, timeout=None):
+        """Пачка событий из очереди, не больше ``BATCH_SIZE``."""
+        batch_size = options()['BATCH_SIZE']
+        events = self.queue
+        try:
+            batch = [events.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < batch_size:
+            try:
+                batch.append(events.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def write(self, batch):
+        if not batch:
+            return 0
+        try:
+            with use_primary():
+                Event.objects.bulk_create(batch)
+        except Exception:
+            logger.exception('Не удалось записать %d событий', len(batch))
+            self.count('failed', len(batch))
+            return 0
+        self.count('written', len(batch))
+        return len(batch)
+
+    def flush(self):
+        """Записывает все накопленные события в текущем потоке."""
+        written = 0
+        batch = self.take(timeout=0)
+        while batch:
+            written += self.write(batch)
+            batch = self.take(timeout=0)
+        return written
+
+    def run(self):
+        while True:
+            config = options()
+            self.write(self.take(timeout=config['FLUSH_INTERVAL']))
+            if time.monotonic() - self._last_rollup >= config[
+                'ROLLUP_INTERVAL'
+            ]:
+                self._last_rollup = time.monotonic()
+                try:
+                    rollup()
+                    analytics.aggregate()
+                except Exception:
+                    logger.exception('Не удалось свернуть журнал событий')
+            close_old_connections()
+
+
+def rollup(limit=10000):
+    """Переносит новые события журнала в ``PageHit`` и просмотры постов.
+
+    Возвращает число обработанных событий. Позиция хранится в
+    ``EventCursor`` и сдвигается в той же транзакции, что и счетчики,
+    поэтому событие не учитывается дважды.
+    """
+    with use_primary(), transaction.atomic():
+        cursor, _ = EventCursor.objects.select_for_update().get_or_create(
+            name=EventCursor.COUNTERS
+        )
+        events = list(Event.objects.filter(
+            pk__gt=cursor.position
+        ).order_by('pk').values_list(
+            'pk', 'kind', 'client_id', 'url', 'post_id', 'ip', 'weight'
+        )[:limit])
+        if not events:
+            return 0
+        hits = Counter()
+        views = Counter()
+        for _, kind, client_id, url, post_id, ip, weight in events:
+            if kind == Event.HIT:
+                hits[(client_id, url)] += weight
+            elif kind == Event.VIEW:
+                views[(post_id, ip)] += weight
+        if hits:
+            page_hits.write(hits)
+        if views:
+            post_views.write(views)
+        cursor.position = events[-1][0]
+        cursor.save(update_fields=['position'])
+    return len(events)
+
+
+pipeline = EventPipeline()
+
+
+def record_hit(user_id, url):
+    if options()['ENABLED']:
+        pipeline.emit(Event.HIT, client_id=user_id, url=url)
+    else:
+        page_hits.add((user_id, url))
+
+
+def record_view(post_id, ip):
+    if options()['ENABLED']:
+        pipeline.emit(Event.VIEW, post_id=post_id, ip=ip)
+    else:
+        post_views.record(post_id, ip)
+
+
+def register_shutdown_flush():
+    atexit.register(pipeline.flush)
@@ -0,0 +1,57 @@
+import hashlib
+
+from django.core.cache import cache
+
+groups_scope = 'groups'
+
+
+def version_key(scope):
+    return f'version:{scope}'
+
+
+def get_versions(*scopes):
+    versions = cache.get_many([version_key(scope) for scope in scopes])
+    return [versions.get(version_key(scope), 0) for scope in scopes]
+
+
+def bump_version(scope):
+    key = version_key(scope)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def invalidate_post_card(post_id):
+    bump_version(post_scope(post_id))
+
+
+def invalidate_groups():
+    bump_version(groups_scope)
+
+
+def post_card_key(post, user):
+    """Ключ карточки поста.
+
+    Кроме версий поста и тематик в ключ входят поля, которые меняются без
+    сохранения модели: число комментариев и просмотров и то, можно ли
+    ещё редактировать пост.
+    """
+    post_version, groups_version = get_versions(
+        post_scope(post.pk), groups_scope
+    )
+    is_author = getattr(user, 'pk', None) == post.author_id
+    parts = (
+        post.pk, post_version, groups_version,
+        post.updated.isoformat(),
+        getattr(post, 'comment_count', ''),
+        post.view_count,
+        'author' if is_author else 'reader',
+        is_author and post.is_recently_pub(),
+    )
+    return hashlib.md5(repr(parts).encode()).hexdigest()
@@ -0,0 +1,92 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+defaults = {
+    # Большая сторона сохраняемой картинки
+    'MAX_SIDE': 1920,
+    'MAX_BYTES': 10 * 1024 * 1024,
+    'MAX_PIXELS': 40 * 1000 * 1000,
+    'FORMAT': 'WEBP',
+    'QUALITY': 82,
+    # Форматы, которые сохраняются как есть (анимация GIF)
+    'KEEP_FORMATS': ('GIF',),
+}
+
+extensions = {'WEBP': '.webp', 'JPEG': '.jpg', 'PNG': '.png'}
+
+
+def options():
+    return {**defaults, **getattr(settings, 'IMAGE_UPLOADS', {})}
+
+
+def validate_image_upload(value):
+    """Отклоняет слишком большие файлы и картинки до их декодирования."""
+    if getattr(value, '_committed', True):
+        return
+    if value.size > options()['MAX_BYTES']:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ',
+            params={'limit': options()['MAX_BYTES'] // (1024 * 1024)},
+        )
+    # Размер берется из заголовка, пиксели не декодируются
+    value.seek(0)
+    try:
+        width, height = Image.open(value).size
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Загрузите правильное изображение')
+    finally:
+        value.seek(0)
+    if width * height > options()['MAX_PIXELS']:
+        raise ValidationError('Слишком большое разрешение изображения')
+
+
+def output_format(image):
+    image_format = options()['FORMAT']
+    if image_format == 'WEBP' and not features.check('webp'):
+        image_format = 'JPEG'
+    if image_format == 'JPEG' and image.mode in ('RGBA', 'LA', 'PA'):
+        image_format = 'PNG'
+    return image_format
+
+
+def process_image(file):
+    """Уменьшает загруженную картинку и пересохраняет её без метаданных.
+
+    Возвращает ``(content, width, height)``; ``content`` равен None, если
+    файл сохраняется без изменений.
+    """
+    file.seek(0)
+    image = Image.open(file)
+    if image.format in options()['KEEP_FORMATS']:
+        width, height = image.size
+        file.seek(0)
+        return None, width, height
+    max_side = options()['MAX_SIDE']
+    # JPEG декодируется сразу в уменьшенном в 2^n раз масштабе
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), reducing_gap=3.0)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = (
+            image.mode in ('LA', 'PA') or 'transparency' in image.info
+        )
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    image_format = output_format(image)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    # EXIF и прочие метаданные не передаются, остается только профиль цвета
+    image.save(
+        buffer, image_format, quality=options()['QUALITY'], optimize=True,
+        icc_profile=image.info.get('icc_profile'),
+    )
+    name = os.path.splitext(os.path.basename(file.name))[0]
+    content = ContentFile(
+        buffer.getvalue(), name=name + extensions[image_format]
+    )
+    return content, image.width, image.height
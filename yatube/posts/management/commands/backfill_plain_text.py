@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment, Post
+from posts.text import backfill
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает текст без разметки и начало постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько объектов обновлять одним запросом',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            updated = backfill(
+                model.objects.all(), batch_size=options['batch_size']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: обновлено {updated}'
+            ))
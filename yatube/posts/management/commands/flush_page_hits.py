@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.buffers import flush_all
+
+
+class Command(BaseCommand):
+    help = 'Сбрасывает накопленные переходы и просмотры в базу данных'
+
+    def handle(self, *args, **options):
+        flushed = flush_all()
+        self.stdout.write(
+            self.style.SUCCESS(f'Записано событий: {flushed}')
+        )
@@ -0,0 +1,100 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.models import Comment, Ip, PageHit, Post, User
+from posts.timeline import TimelineFeed
+
+# Просмотр всей таблицы (в старых SQLite - SCAN TABLE), возможно по индексу
+table_scan = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*\bUSING\b)?')
+# Сортировка или группировка всей выборки во временном B-дереве.
+# Досортировка по id (RIGHT PART OF ORDER BY) ожидаема
+temp_sort = re.compile(r'USE TEMP B-TREE FOR (?:ORDER|GROUP) BY')
+
+feed_size = 10
+
+
+def feed(queryset):
+    return queryset.for_feed().order_by('-pub_date', '-id')[:feed_size + 1]
+
+
+def canonical_queries():
+    """Запросы, которые выполняются на каждой странице."""
+    user = User(pk=1)
+    return [
+        ('лента', feed(Post.objects.all())),
+        ('лента группы', feed(Post.objects.filter(group_id=1))),
+        ('профиль', feed(Post.objects.filter(author_id=1))),
+        ('подписки', feed(
+            Post.objects.filter(author__following__user=user)
+        )),
+        *(
+            (f'подписки: {name}', queryset) for name, queryset
+            in TimelineFeed(user).queries(limit=feed_size + 1)
+        ),
+        ('комментарии поста', Comment.objects.filter(
+            post_id=1
+        ).select_related('author').order_by('-created')),
+        ('переход', PageHit.objects.filter(client_id=1, url='/')),
+        ('адрес', Ip.objects.filter(ip='127.0.0.1')),
+    ]
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Таблицы, которые читаются целиком.
+
+    Просмотр по индексу тоже считается полным, если результат потом
+    сортируется или группируется: LIMIT тогда не останавливает чтение.
+    """
+    sorted_plan = any(map(temp_sort.search, plan))
+    return [
+        match.group(1) for match in map(table_scan.match, plan)
+        if match and (not match.group(2) or sorted_plan)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает планы основных запросов ленты и отмечает полные '
+        'просмотры таблиц и сортировки без индекса'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться ошибкой, если найдены проблемы',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'Планы разбираются только для SQLite, для '
+                f'{connection.vendor} используйте EXPLAIN самой базы'
+            )
+        failed = []
+        for name, queryset in canonical_queries():
+            plan = explain(queryset)
+            tables = full_scans(plan)
+            if tables:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: полный просмотр {", ".join(tables)}'
+                ))
+            elif any(map(temp_sort.search, plan)):
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: сортировка без индекса'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+            for detail in plan:
+                self.stdout.write(f'    {detail}')
+        if failed and options['strict']:
+            raise CommandError(f'Запросы без индекса: {", ".join(failed)}')
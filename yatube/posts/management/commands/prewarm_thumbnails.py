@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import options, run_in_worker
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры картинок уже опубликованных постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=options()['WORKERS'],
+            help='Сколько картинок обрабатывать параллельно',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only('pk', 'image')
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(
+                lambda post: run_in_worker(post.image, post.pk),
+                posts.iterator(),
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {results.count(True)}, '
+            f'ошибок: {results.count(False)}'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        indexed = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано документов: {indexed}')
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Исправляет расхождения в статистике пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать число расхождений, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        created, drifted = reconcile(dry_run=options['dry_run'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {created}, исправлено расхождений: {drifted}'
+        ))
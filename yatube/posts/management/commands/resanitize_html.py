@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from posts.fragments import invalidate_post_card
+from posts.models import Comment, Post
+from posts.sanitizer import resanitize
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает проверенный HTML постов и комментариев, '
+        'если изменился текст или белый список'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько объектов обновлять одним запросом',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = resanitize(Post.objects.all(), batch_size=batch_size)
+        comments = resanitize(Comment.objects.all(), batch_size=batch_size)
+        # Карточки кешируются по версии поста, а bulk_update без сигналов
+        post_ids = set(posts)
+        for start in range(0, len(comments), batch_size):
+            post_ids.update(Comment.objects.filter(
+                pk__in=comments[start:start + batch_size]
+            ).values_list('post_id', flat=True))
+        for post_id in post_ids:
+            invalidate_post_card(post_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено постов: {len(posts)}, '
+            f'комментариев: {len(comments)}'
+        ))
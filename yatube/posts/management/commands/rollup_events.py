@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from posts import analytics
+from posts.events import pipeline, rollup
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает события из очереди процесса и переносит журнал '
+        'событий в счетчики переходов и просмотров и в статистику по '
+        'периодам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--compact', action='store_true',
+            help='Удалить устаревшие счетчики периодов и события журнала',
+        )
+
+    def handle(self, *args, **options):
+        pipeline.flush()
+        totals = []
+        for job in (rollup, analytics.aggregate):
+            total = processed = job()
+            while processed:
+                processed = job()
+                total += processed
+            totals.append(total)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано событий: {totals[0]}, '
+            f'в статистику по периодам: {totals[1]}'
+        ))
+        if options['compact']:
+            deleted = analytics.compact()
+            self.stdout.write(f'Удалено строк: {sum(deleted.values())}')
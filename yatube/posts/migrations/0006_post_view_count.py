@@ -0,0 +1,30 @@
+# Generated by Django 2.2.24 on 2026-10-18 16:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_view_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    views = Post.views.through.objects.filter(
+        post=OuterRef('pk')
+    ).values('post').annotate(total=Count('ip')).values('total')
+    Post.objects.filter(views__isnull=False).update(
+        view_count=Subquery(views)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_auto_20210624_1354'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество просмотров'),
+        ),
+        migrations.RunPython(backfill_view_count, migrations.RunPython.noop),
+    ]
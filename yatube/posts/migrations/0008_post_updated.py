@@ -0,0 +1,25 @@
+# Generated by Django 2.2.24 on 2026-10-18 16:38
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(backfill_updated, migrations.RunPython.noop),
+    ]
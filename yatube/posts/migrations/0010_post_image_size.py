@@ -0,0 +1,46 @@
+# Generated by Django 2.2.24 on 2026-10-18 16:49
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image
+import posts.images
+
+
+def backfill_image_size(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+    for post in posts.only('pk', 'image').iterator():
+        try:
+            with default_storage.open(post.image.name) as file:
+                width, height = Image.open(file).size
+        except (OSError, Image.DecompressionBombError):
+            continue
+        Post.objects.filter(pk=post.pk).update(
+            image_width=width, image_height=height
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Можете загрузить изображение', null=True, upload_to='posts/', validators=[posts.images.validate_image_upload], verbose_name='Изображение'),
+        ),
+        migrations.RunPython(backfill_image_size, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+import html
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+documents = {
+    'post': ('text', 'author', 'group_title'),
+    'comment': ('text', 'author'),
+}
+
+
+def plain_text(value):
+    return html.unescape(strip_tags(value or ''))
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    with schema_editor.connection.cursor() as cursor:
+        for kind, columns in documents.items():
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS posts_{kind}_fts '
+                f'USING fts5({", ".join(columns)}, '
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+        posts = Post.objects.select_related('author', 'group')
+        cursor.executemany(
+            'INSERT INTO posts_post_fts (rowid, text, author, group_title) '
+            'VALUES (%s, %s, %s, %s)',
+            [
+                (post.pk, plain_text(post.text), post.author.username,
+                 post.group.title if post.group_id else '')
+                for post in posts.iterator()
+            ],
+        )
+        comments = Comment.objects.select_related('author')
+        cursor.executemany(
+            'INSERT INTO posts_comment_fts (rowid, text, author) '
+            'VALUES (%s, %s, %s)',
+            [
+                (comment.pk, plain_text(comment.text),
+                 comment.author.username)
+                for comment in comments.iterator()
+            ],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for kind in documents:
+            cursor.execute(f'DROP TABLE IF EXISTS posts_{kind}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_image_size'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.24 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+from posts.text import backfill
+
+
+def backfill_plain_text(apps, schema_editor):
+    for model_name in ('Post', 'Comment'):
+        backfill(apps.get_model('posts', model_name).objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Начало комментария'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_plain',
+            field=models.TextField(blank=True, editable=False, verbose_name='Комментарий без разметки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Начало статьи'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_plain',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст статьи без разметки'),
+        ),
+        migrations.RunPython(backfill_plain_text, migrations.RunPython.noop),
+    ]
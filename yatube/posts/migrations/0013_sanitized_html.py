@@ -0,0 +1,41 @@
+# Generated by Django 2.2.24 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+from posts.sanitizer import resanitize
+
+
+def sanitize_existing(apps, schema_editor):
+    for model_name in ('Post', 'Comment'):
+        resanitize(apps.get_model('posts', model_name).objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_plain_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='text_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Хеш исходного текста'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Комментарий: проверенный HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Хеш исходного текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст статьи: проверенный HTML'),
+        ),
+        migrations.RunPython(sanitize_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_page_hits(apps, schema_editor):
+    PageHit = apps.get_model('posts', 'PageHit')
+    duplicates = PageHit.objects.values('client', 'url').annotate(
+        keep=Min('pk'), total=Sum('count'), rows=Count('pk')
+    ).filter(rows__gt=1)
+    for row in duplicates:
+        PageHit.objects.filter(pk=row['keep']).update(count=row['total'])
+        PageHit.objects.filter(
+            client=row['client'], url=row['url']
+        ).exclude(pk=row['keep']).delete()
+
+
+def merge_ips(apps, schema_editor):
+    Ip = apps.get_model('posts', 'Ip')
+    Views = apps.get_model('posts', 'Post').views.through
+    duplicates = Ip.objects.values('ip').annotate(
+        keep=Min('pk'), rows=Count('pk')
+    ).filter(rows__gt=1)
+    for row in duplicates:
+        extra = list(Ip.objects.filter(ip=row['ip']).exclude(
+            pk=row['keep']
+        ).values_list('pk', flat=True))
+        # Просмотры переносятся на оставшийся ip, повторы пар удаляются
+        seen = set(Views.objects.filter(
+            ip_id=row['keep']
+        ).values_list('post_id', flat=True))
+        for pk, post_id in Views.objects.filter(
+            ip_id__in=extra
+        ).values_list('pk', 'post_id'):
+            if post_id in seen:
+                Views.objects.filter(pk=pk).delete()
+            else:
+                Views.objects.filter(pk=pk).update(ip_id=row['keep'])
+                seen.add(post_id)
+        Ip.objects.filter(pk__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_sanitized_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_page_hits, migrations.RunPython.noop),
+        migrations.RunPython(merge_ips, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.24 on 2026-10-18 17:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hit', 'Переход'), ('view', 'Просмотр статьи')], max_length=10, verbose_name='Тип')),
+                ('client_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='Кто переходил')),
+                ('url', models.CharField(blank=True, max_length=100)),
+                ('post_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='Статья')),
+                ('ip', models.CharField(blank=True, max_length=100, verbose_name='ip пользователя')),
+                ('weight', models.PositiveIntegerField(default=1, help_text='Сколько событий заменяет одно при выборочной записи', verbose_name='Вес')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время события')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'Журнал событий',
+            },
+        ),
+        migrations.CreateModel(
+            name='EventCursor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0, verbose_name='Последнее обработанное событие')),
+            ],
+            options={
+                'verbose_name': 'Позиция в журнале событий',
+                'verbose_name_plural': 'Позиции в журнале событий',
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.24 on 2026-10-18 17:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_event_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HitRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Час'), ('day', 'День')], max_length=4, verbose_name='Период')),
+                ('start', models.DateTimeField(verbose_name='Начало периода')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Событий')),
+                ('url', models.CharField(max_length=100)),
+            ],
+            options={
+                'verbose_name': 'Переходы за период',
+                'verbose_name_plural': 'Переходы по периодам',
+            },
+        ),
+        migrations.CreateModel(
+            name='ViewRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Час'), ('day', 'День')], max_length=4, verbose_name='Период')),
+                ('start', models.DateTimeField(verbose_name='Начало периода')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Событий')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_rollups', to='posts.Post', verbose_name='Статья')),
+            ],
+            options={
+                'verbose_name': 'Просмотры за период',
+                'verbose_name_plural': 'Просмотры по периодам',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hitrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'start', 'url'), name='unique hit rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='viewrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'start', 'post'), name='unique view rollup'),
+        ),
+    ]
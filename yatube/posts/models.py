@@ -2,26 +2,61 @@ import datetime as dt
 
 from django.utils import timezone
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
 from tinymce import models as tinymce_models
 
+from .images import process_image, validate_image_upload
+from .sanitizer import fill_sanitized_html
+from .text import fill_plain_text
+
 User = get_user_model()
 
 
 class Ip(models.Model):
     ip = models.CharField(
-        max_length=100, verbose_name='ip пользователя',
+        max_length=100, unique=True, verbose_name='ip пользователя',
         )
 
     def __str__(self):
         return self.ip
 
 
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    followers = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчиков',
+    )
+    following = models.PositiveIntegerField(
+        default=0, verbose_name='Подписок',
+    )
+    posts = models.PositiveIntegerField(
+        default=0, verbose_name='Статей',
+    )
+    comments = models.PositiveIntegerField(
+        default=0, verbose_name='Комментариев',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
 class PageHit(models.Model):
+    # Отдельный индекс не нужен: ключ - первая колонка (client, url)
     client = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='page_hit',
+        db_index=False,
         verbose_name='Кто переходил',
     )
     url = models.CharField(max_length=100)
@@ -29,6 +64,11 @@ class PageHit(models.Model):
 
     class Meta:
         ordering = ['client', '-count']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['client', 'url'],
+                name='unique page hit')
+        ]
 
 
 class Group(models.Model):
@@ -52,24 +92,65 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        # Подзапрос считает комментарии только у постов страницы: JOIN с
+        # GROUP BY сначала сгруппировал бы всю ленту и лишь потом LIMIT
+        comments = Comment.objects.filter(
+            post=models.OuterRef('pk')
+        ).order_by().values('post').annotate(
+            total=models.Count('pk')
+        ).values('total')
+        return self.select_related('author', 'group').annotate(
+            comment_count=Coalesce(
+                models.Subquery(comments, output_field=models.IntegerField()),
+                models.Value(0),
+            )
+        )
+
+
 class Post(models.Model):
     text = tinymce_models.HTMLField(
         verbose_name='Текст статьи',
         help_text='Что у вас нового?'
     )
+    text_plain = models.TextField(
+        blank=True, editable=False,
+        verbose_name='Текст статьи без разметки',
+    )
+    text_html = models.TextField(
+        blank=True, editable=False,
+        verbose_name='Текст статьи: проверенный HTML',
+    )
+    text_hash = models.CharField(
+        max_length=64, blank=True, editable=False,
+        verbose_name='Хеш исходного текста',
+    )
+    excerpt = models.CharField(
+        max_length=255, blank=True, editable=False,
+        verbose_name='Начало статьи',
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+    # Отдельный индекс не нужен: ключ - первая колонка индекса из Meta
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='posts',
+        db_index=False,
         verbose_name='Автор статьи',
     )
+    # Отдельный индекс не нужен: ключ - первая колонка индекса из Meta
     group = models.ForeignKey(
         Group, on_delete=models.SET_NULL,
         blank=True, null=True,
         related_name='group_posts',
+        db_index=False,
         verbose_name='Тематика статьи',
         help_text='Можете выбрать тематику'
     )
@@ -79,32 +160,74 @@ class Post(models.Model):
         null=True,
         verbose_name='Изображение',
         help_text='Можете загрузить изображение',
+        validators=[validate_image_upload],
+    )
+    image_width = models.PositiveIntegerField(
+        blank=True, null=True, editable=False,
+        verbose_name='Ширина изображения',
+    )
+    image_height = models.PositiveIntegerField(
+        blank=True, null=True, editable=False,
+        verbose_name='Высота изображения',
     )
     views = models.ManyToManyField(
         Ip, related_name="post_views",
         blank=True
     )
+    view_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='Количество просмотров',
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date'],
+                name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx'),
+        ]
         verbose_name = 'Статья'
         verbose_name_plural = 'Статьи'
 
     def __str__(self):
-        return self.text[:15]
+        return self.excerpt[:15]
+
+    def save(self, *args, **kwargs):
+        # Новая картинка уменьшается и пересохраняется до записи в хранилище
+        if self.image and not self.image._committed:
+            content, width, height = process_image(self.image)
+            if content is not None:
+                self.image.save(content.name, content, save=False)
+            self.image_width, self.image_height = width, height
+        elif not self.image:
+            self.image_width = self.image_height = None
+        kwargs['update_fields'] = fill_sanitized_html(
+            self, fill_plain_text(self, kwargs.get('update_fields'))
+        )
+        super().save(*args, **kwargs)
 
     def is_recently_pub(self):
         now = timezone.now()
         return self.pub_date >= (now - dt.timedelta(hours=1))
 
     def total_views(self):
-        return self.views.count()
+        return self.view_count
 
 
 class Comment(models.Model):
+    # Отдельный индекс не нужен: ключ - первая колонка индекса из Meta
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE,
         related_name='comments',
+        db_index=False,
         verbose_name='Cтатья с комментариями',
     )
     author = models.ForeignKey(
@@ -116,6 +239,22 @@ class Comment(models.Model):
         verbose_name='Комментарий',
         help_text='Напишите комменатрий',
     )
+    text_plain = models.TextField(
+        blank=True, editable=False,
+        verbose_name='Комментарий без разметки',
+    )
+    text_html = models.TextField(
+        blank=True, editable=False,
+        verbose_name='Комментарий: проверенный HTML',
+    )
+    text_hash = models.CharField(
+        max_length=64, blank=True, editable=False,
+        verbose_name='Хеш исходного текста',
+    )
+    excerpt = models.CharField(
+        max_length=255, blank=True, editable=False,
+        verbose_name='Начало комментария',
+    )
     created = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации',
@@ -123,11 +262,22 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='comment_post_created_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
-        return self.text[:15]
+        return self.excerpt[:15]
+
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = fill_sanitized_html(
+            self, fill_plain_text(self, kwargs.get('update_fields'))
+        )
+        super().save(*args, **kwargs)
 
     def is_recently_pub(self):
         now = timezone.now()
@@ -154,3 +304,139 @@ class Follow(models.Model):
         ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Статья',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique timeline entry')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='timeline_user_pub_date_idx')
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+
+class Event(models.Model):
+    """Событие аналитики: переход по странице или просмотр поста.
+
+    Журнал только пополняется. Счетчики ``PageHit`` и просмотры постов
+    собираются из него по позиции в ``EventCursor``.
+    """
+    HIT = 'hit'
+    VIEW = 'view'
+    KINDS = [
+        (HIT, 'Переход'),
+        (VIEW, 'Просмотр статьи'),
+    ]
+    kind = models.CharField(
+        max_length=10, choices=KINDS, verbose_name='Тип',
+    )
+    # Простые числа, а не внешние ключи: запись журнала не проверяется
+    # и не удаляется вместе с пользователем или статьей
+    client_id = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name='Кто переходил',
+    )
+    url = models.CharField(max_length=100, blank=True)
+    post_id = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name='Статья',
+    )
+    ip = models.CharField(
+        max_length=100, blank=True, verbose_name='ip пользователя',
+    )
+    weight = models.PositiveIntegerField(
+        default=1, verbose_name='Вес',
+        help_text='Сколько событий заменяет одно при выборочной записи',
+    )
+    created = models.DateTimeField(
+        default=timezone.now, verbose_name='Время события',
+    )
+
+    class Meta:
+        verbose_name = 'Событие'
+        verbose_name_plural = 'Журнал событий'
+
+
+class EventCursor(models.Model):
+    # Обработчики журнала: счетчики PageHit и просмотров постов и
+    # счетчики по периодам
+    COUNTERS = 'counters'
+    ROLLUPS = 'rollups'
+    NAMES = [COUNTERS, ROLLUPS]
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(
+        default=0, verbose_name='Последнее обработанное событие',
+    )
+
+    class Meta:
+        verbose_name = 'Позиция в журнале событий'
+        verbose_name_plural = 'Позиции в журнале событий'
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
+
+
+class Rollup(models.Model):
+    """Счетчик событий за час или за день."""
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIODS = [
+        (HOUR, 'Час'),
+        (DAY, 'День'),
+    ]
+    period = models.CharField(
+        max_length=4, choices=PERIODS, verbose_name='Период',
+    )
+    start = models.DateTimeField(verbose_name='Начало периода')
+    count = models.PositiveIntegerField(default=0, verbose_name='Событий')
+
+    class Meta:
+        abstract = True
+
+
+class HitRollup(Rollup):
+    url = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'start', 'url'],
+                name='unique hit rollup')
+        ]
+        verbose_name = 'Переходы за период'
+        verbose_name_plural = 'Переходы по периодам'
+
+
+class ViewRollup(Rollup):
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name='view_rollups',
+        verbose_name='Статья',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'start', 'post'],
+                name='unique view rollup')
+        ]
+        verbose_name = 'Просмотры за период'
+        verbose_name_plural = 'Просмотры по периодам'
@@ -0,0 +1,171 @@
+import base64
+import binascii
+
+from django.db.models import Q, QuerySet
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+
+# Дальше этой страницы ?page= не листается: глубокий OFFSET заменяет курсор
+offset_pages_limit = 5
+
+
+def encode_cursor(post):
+    value = f'{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        pub_date, pk = base64.urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class FeedPage:
+    def __init__(self, object_list, has_next, has_previous,
+                 previous_query=None, next_query=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self._previous_query = previous_query
+        self._next_query = next_query
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_query(self):
+        if self._next_query is not None:
+            return self._next_query
+        return urlencode({'after': encode_cursor(self.object_list[-1])})
+
+    @property
+    def previous_query(self):
+        if self._previous_query is not None:
+            return self._previous_query
+        return urlencode({'before': encode_cursor(self.object_list[0])})
+
+
+def keyset(after=None, before=None, pk='id'):
+    """Условие на (pub_date, ``pk``): записи старше ``after`` или новее
+    ``before``."""
+    if after is not None:
+        pub_date, value = after
+        return Q(pub_date__lt=pub_date) | Q(
+            pub_date=pub_date, **{f'{pk}__lt': value}
+        )
+    pub_date, value = before
+    return Q(pub_date__gt=pub_date) | Q(
+        pub_date=pub_date, **{f'{pk}__gt': value}
+    )
+
+
+class QuerySetFeed:
+    """Лента из запроса к постам в порядке (-pub_date, -id)."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset.order_by('-pub_date', '-id')
+
+    def window(self, after=None, before=None, offset=0, limit=None):
+        """``limit`` постов после курсора, до него (в обратном порядке,
+        начиная с ближайшего) или со смещения ``offset``."""
+        if after is not None:
+            return list(self.queryset.filter(keyset(after=after))[:limit])
+        if before is not None:
+            return list(self.queryset.filter(
+                keyset(before=before)
+            ).reverse()[:limit])
+        end = None if limit is None else offset + limit
+        return list(self.queryset[offset:end])
+
+
+def paginate_feed(request, feed, per_page):
+    """Постраничный вывод ленты по ключу (pub_date, id).
+
+    ``?after=`` и ``?before=`` листают ленту к более старым и более новым
+    записям без COUNT и OFFSET, ``?page=`` поддерживается для первых
+    ``offset_pages_limit`` страниц, дальше - 404: ссылки ведут по
+    курсору. ``feed`` - запрос к постам или объект с методом ``window``
+    как у ``QuerySetFeed``.
+    """
+    if isinstance(feed, QuerySet):
+        feed = QuerySetFeed(feed)
+    after = decode_cursor(request.GET.get('after'))
+    before = decode_cursor(request.GET.get('before'))
+    if after is not None:
+        posts = feed.window(after=after, limit=per_page + 1)
+        # Курсор за концом ленты (старые посты удалены) ведет на первую
+        # страницу, как и курсор ?before= перед ее началом
+        if posts:
+            return FeedPage(posts[:per_page], len(posts) > per_page, True)
+    if before is not None:
+        posts = feed.window(before=before, limit=per_page + 1)
+        if posts:
+            return FeedPage(
+                posts[:per_page][::-1], True, len(posts) > per_page
+            )
+    try:
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        number = 1
+    if number > offset_pages_limit:
+        raise Http404(f'Страницы дальше {offset_pages_limit} - по ?after=')
+    number = max(number, 1)
+    offset = (number - 1) * per_page
+    posts = feed.window(offset=offset, limit=per_page + 1)
+    if not posts and number > 1:
+        number, posts = 1, feed.window(limit=per_page + 1)
+    previous_query = None
+    if number > 1:
+        previous_query = urlencode({'page': number - 1})
+    return FeedPage(
+        posts[:per_page], len(posts) > per_page, number > 1, previous_query
+    )
+
+
+def paginate_ranked(request, queryset, ids, per_page):
+    """Постраничный вывод объектов в порядке списка ключей ``ids``.
+
+    Из базы загружается только текущая страница.
+    """
+    try:
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        number = 1
+    pages = max((len(ids) - 1) // per_page + 1, 1)
+    number = min(max(number, 1), pages)
+    page_ids = ids[(number - 1) * per_page:number * per_page]
+    objects = queryset.in_bulk(page_ids)
+    params = request.GET.copy()
+    params['page'] = number - 1
+    previous_query = params.urlencode()
+    params['page'] = number + 1
+    return FeedPage(
+        [objects[pk] for pk in page_ids if pk in objects],
+        number < pages, number > 1, previous_query, params.urlencode(),
+    )
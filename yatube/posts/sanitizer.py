@@ -0,0 +1,172 @@
+import hashlib
+import re
+from html import escape
+from html.parser import HTMLParser
+
+from django.conf import settings
+
+defaults = {
+    'TAGS': (
+        'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'em', 'h1', 'h2',
+        'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre',
+        's', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th',
+        'thead', 'tr', 'u', 'ul',
+    ),
+    'ATTRIBUTES': {
+        'a': ('href', 'title'),
+        'abbr': ('title',),
+        'img': ('src', 'alt', 'title', 'width', 'height'),
+        'td': ('colspan', 'rowspan'),
+        'th': ('colspan', 'rowspan'),
+    },
+    'PROTOCOLS': ('http', 'https', 'mailto'),
+}
+
+# Содержимое этих тегов выбрасывается целиком, а не только разметка
+dropped_content = {'script', 'style', 'iframe', 'object', 'template'}
+void_tags = {'br', 'hr', 'img'}
+url_attributes = {'href', 'src'}
+
+control = re.compile(r'[\x00-\x20]+')
+scheme = re.compile(r'^([a-z][a-z0-9+.\-]*):')
+
+
+def options():
+    return {**defaults, **getattr(settings, 'HTML_SANITIZER', {})}
+
+
+def allowlist_signature():
+    allowlist = options()
+    return repr((
+        sorted(allowlist['TAGS']),
+        sorted(
+            (tag, sorted(attributes))
+            for tag, attributes in allowlist['ATTRIBUTES'].items()
+        ),
+        sorted(allowlist['PROTOCOLS']),
+    ))
+
+
+def content_hash(text, signature=None):
+    """Хеш текста вместе с белым списком: меняется при смене правил."""
+    if signature is None:
+        signature = allowlist_signature()
+    value = f'{signature}\0{text or ""}'
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class Sanitizer(HTMLParser):
+    def __init__(self, tags, attributes, protocols):
+        super().__init__(convert_charrefs=True)
+        self.tags = set(tags)
+        self.attributes = attributes
+        self.protocols = set(protocols)
+        self.output = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def is_safe_url(self, value):
+        match = scheme.match(control.sub('', value).lower())
+        return match is None or match.group(1) in self.protocols
+
+    def clean_attributes(self, tag, attrs):
+        allowed = self.attributes.get(tag, ())
+        result = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in url_attributes and not self.is_safe_url(value):
+                continue
+            result.append(f' {name}="{escape(value, quote=True)}"')
+        return ''.join(result)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in dropped_content:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in self.tags:
+            return
+        self.output.append(f'<{tag}{self.clean_attributes(tag, attrs)}>')
+        if tag not in void_tags:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in dropped_content:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in void_tags and self.open_tags[-1:] == [tag]:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in dropped_content:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Незакрытые вложенные теги закрываются вместе с внешним
+        while self.open_tags:
+            current = self.open_tags.pop()
+            self.output.append(f'</{current}>')
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.output.append(escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        while self.open_tags:
+            self.output.append(f'</{self.open_tags.pop()}>')
+        return ''.join(self.output)
+
+
+def sanitize(text):
+    """Оставляет в HTML только разрешенные теги, атрибуты и ссылки."""
+    allowlist = options()
+    parser = Sanitizer(
+        allowlist['TAGS'], allowlist['ATTRIBUTES'], allowlist['PROTOCOLS']
+    )
+    parser.feed(text or '')
+    return parser.result()
+
+
+def fill_sanitized_html(instance, update_fields=None):
+    """Обновляет text_html, только если текст или белый список изменились.
+
+    Возвращает update_fields с добавленными полями, если он передан.
+    """
+    digest = content_hash(instance.text)
+    if digest != instance.text_hash:
+        instance.text_html = sanitize(instance.text)
+        instance.text_hash = digest
+    if update_fields is not None and 'text' in update_fields:
+        update_fields = {*update_fields, 'text_html', 'text_hash'}
+    return update_fields
+
+
+def resanitize(queryset, batch_size=500):
+    """Пересобирает text_html у объектов с устаревшим хешем.
+
+    Возвращает ключи обновленных объектов.
+    """
+    model = queryset.model
+    fields = ['text_html', 'text_hash']
+    batch = []
+    updated = []
+    signature = allowlist_signature()
+    rows = queryset.only('pk', 'text', 'text_hash')
+    for obj in rows.iterator(chunk_size=batch_size):
+        digest = content_hash(obj.text, signature)
+        if digest == obj.text_hash:
+            continue
+        obj.text_html, obj.text_hash = sanitize(obj.text), digest
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, fields)
+            updated.extend(item.pk for item in batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, fields)
+        updated.extend(item.pk for item in batch)
+    return updated
@@ -0,0 +1,230 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post
+
+defaults = {
+    'BACKEND': 'posts.search.Fts5Backend',
+    # Сколько лучших совпадений возвращает поиск; порядок задается через
+    # CASE, поэтому число параметров запроса растет втрое от LIMIT
+    'LIMIT': 200,
+}
+
+# Колонки индекса для каждого вида документов
+documents = {
+    'post': ('text', 'author', 'group_title'),
+    'comment': ('text', 'author'),
+}
+
+word = re.compile(r'\w+')
+
+
+def options():
+    return {**defaults, **getattr(settings, 'SEARCH', {})}
+
+
+def post_document(post):
+    return {
+        'text': post.text_plain,
+        'author': post.author.username,
+        'group_title': post.group.title if post.group_id else '',
+    }
+
+
+def comment_document(comment):
+    return {
+        'text': comment.text_plain,
+        'author': comment.author.username,
+    }
+
+
+class SearchBackend:
+    """Интерфейс поискового индекса.
+
+    Документ - словарь с колонками из ``documents[kind]``, ``search``
+    возвращает первичные ключи от лучшего совпадения к худшему.
+    """
+
+    def setup(self):
+        pass
+
+    def index(self, kind, pk, document):
+        raise NotImplementedError
+
+    def remove(self, kind, pk):
+        raise NotImplementedError
+
+    def clear(self, kind):
+        raise NotImplementedError
+
+    def search(self, kind, query, limit):
+        raise NotImplementedError
+
+    def filter(self, kind, queryset, query):
+        """Оставляет в queryset только найденные объекты, без ранжирования."""
+        return queryset.filter(
+            pk__in=self.search(kind, query, options()['LIMIT'])
+        )
+
+
+class Fts5Backend(SearchBackend):
+    """Индекс в виртуальных таблицах SQLite FTS5, rowid - ключ объекта."""
+
+    def table(self, kind):
+        return f'posts_{kind}_fts'
+
+    def setup(self):
+        with connection.cursor() as cursor:
+            for kind, columns in documents.items():
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table(kind)} '
+                    f'USING fts5({", ".join(columns)}, '
+                    f"tokenize='unicode61 remove_diacritics 2')"
+                )
+
+    def index(self, kind, pk, document):
+        columns = documents[kind]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table(kind)} WHERE rowid = %s', [pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table(kind)} '
+                f'(rowid, {", ".join(columns)}) '
+                f'VALUES (%s{", %s" * len(columns)})',
+                [pk, *(document[column] for column in columns)],
+            )
+
+    def remove(self, kind, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table(kind)} WHERE rowid = %s', [pk]
+            )
+
+    def clear(self, kind):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table(kind)}')
+
+    def match_query(self, query):
+        # Каждое слово ищется как префикс, слова объединяются через AND;
+        # кавычки не дают пользователю использовать синтаксис FTS5
+        words = word.findall(query.lower())[:10]
+        return ' '.join(f'"{value}"*' for value in words)
+
+    def search(self, kind, query, limit):
+        match = self.match_query(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table(kind)} '
+                f'WHERE {self.table(kind)} MATCH %s ORDER BY rank LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, kind, queryset, query):
+        match = self.match_query(query)
+        if not match:
+            return queryset.none()
+        # Подзапрос к индексу: SQL не зависит от найденных ключей
+        opts = queryset.model._meta
+        return queryset.extra(
+            where=[
+                f'{opts.db_table}.{opts.pk.column} IN ('
+                f'SELECT rowid FROM {self.table(kind)} '
+                f'WHERE {self.table(kind)} MATCH %s)'
+            ],
+            params=[match],
+        )
+
+
+class DatabaseBackend(SearchBackend):
+    """Запасной бэкенд без индекса: поиск подстроки в тексте."""
+
+    def index(self, kind, pk, document):
+        pass
+
+    def remove(self, kind, pk):
+        pass
+
+    def clear(self, kind):
+        pass
+
+    def search(self, kind, query, limit):
+        model = {'post': Post, 'comment': Comment}[kind]
+        words = word.findall(query)[:10]
+        if not words:
+            return []
+        queryset = model.objects.order_by('-pk')
+        for value in words:
+            queryset = queryset.filter(text_plain__icontains=value)
+        return list(queryset.values_list('pk', flat=True)[:limit])
+
+
+def get_backend():
+    return import_string(options()['BACKEND'])()
+
+
+def index_post(post):
+    get_backend().index('post', post.pk, post_document(post))
+
+
+def index_comment(comment):
+    get_backend().index('comment', comment.pk, comment_document(comment))
+
+
+def index_author(user_id):
+    """Переиндексирует посты и комментарии пользователя: имя автора
+    входит в их документы."""
+    backend = get_backend()
+    posts = Post.objects.filter(author=user_id).select_related(
+        'author', 'group'
+    )
+    for post in posts.iterator():
+        backend.index('post', post.pk, post_document(post))
+    comments = Comment.objects.filter(author=user_id).select_related('author')
+    for comment in comments.iterator():
+        backend.index('comment', comment.pk, comment_document(comment))
+
+
+def remove(kind, pk):
+    get_backend().remove(kind, pk)
+
+
+def rebuild():
+    backend = get_backend()
+    backend.setup()
+    backend.clear('post')
+    backend.clear('comment')
+    total = 0
+    for post in Post.objects.select_related('author', 'group').iterator():
+        backend.index('post', post.pk, post_document(post))
+        total += 1
+    for comment in Comment.objects.select_related('author').iterator():
+        backend.index('comment', comment.pk, comment_document(comment))
+        total += 1
+    return total
+
+
+def search_ids(kind, query):
+    return get_backend().search(kind, query, options()['LIMIT'])
+
+
+def search_filter(kind, queryset, query):
+    return get_backend().filter(kind, queryset, query)
+
+
+def ranked(queryset, ids):
+    """Объекты с ключами ``ids`` в порядке релевантности."""
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *(When(pk=pk, then=Value(position))
+          for position, pk in enumerate(ids)),
+        output_field=IntegerField(),
+    ))
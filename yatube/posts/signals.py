@@ -0,0 +1,152 @@
+import threading
+
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import conditional, fragments, search, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+# Посты, удаляемые в текущем потоке: их комментарии удаляются каскадом,
+# и отдельно отмечать изменение поста для каждого не нужно
+deleting = threading.local()
+
+
+def touch_comment_post(comment):
+    if comment.post_id in getattr(deleting, 'posts', ()):
+        return
+    if Comment.post.is_cached(comment):
+        post = comment.post
+        conditional.touch_post(post.pk, post.author_id, post.group_id)
+    else:
+        conditional.touch_posts([comment.post_id])
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, update_fields, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    # Вход пользователя меняет только last_login, страниц это не касается
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        conditional.touch(conditional.users_scope)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields, **kwargs):
+    instance._previous_username = None
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    if instance.pk is not None:
+        instance._previous_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, **kwargs):
+    # Имя автора входит в поисковые документы его постов и комментариев
+    previous = getattr(instance, '_previous_username', None)
+    if previous is not None and previous != instance.username:
+        search.index_author(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    conditional.touch(conditional.users_scope)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    # Пост мог уйти из группы: её страница тоже изменилась
+    instance._previous_group_id = None
+    if instance.pk is not None:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust(instance.author_id, 'posts', 1)
+        timeline.fan_out_post(instance)
+        conditional.forget_recent_posts(instance.author_id)
+    # Заодно сбрасывает закешированную карточку поста
+    conditional.touch_post(instance.pk, instance.author_id, instance.group_id)
+    previous = getattr(instance, '_previous_group_id', None)
+    if previous is not None and previous != instance.group_id:
+        conditional.touch(conditional.group_scope(previous))
+    search.index_post(instance)
+    thumbnails.schedule(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    if not hasattr(deleting, 'posts'):
+        deleting.posts = set()
+    deleting.posts.add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    getattr(deleting, 'posts', set()).discard(instance.pk)
+    stats.adjust(instance.author_id, 'posts', -1)
+    search.remove('post', instance.pk)
+    conditional.forget_recent_posts(instance.author_id)
+    conditional.touch_post(instance.pk, instance.author_id, instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust(instance.author_id, 'comments', 1)
+    search.index_comment(instance)
+    touch_comment_post(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.adjust(instance.author_id, 'comments', -1)
+    search.remove('comment', instance.pk)
+    touch_comment_post(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления у постов уже не будет ссылки на группу
+    instance._post_ids = list(
+        instance.group_posts.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    conditional.touch(fragments.groups_scope,
+                      conditional.group_scope(instance.pk))
+    post_ids = getattr(instance, '_post_ids', None)
+    if post_ids is None:
+        post_ids = instance.group_posts.values_list('pk', flat=True)
+    posts = Post.objects.filter(pk__in=list(post_ids))
+    for post in posts.select_related('author', 'group').iterator():
+        search.index_post(post)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust(instance.author_id, 'followers', 1)
+        stats.adjust(instance.user_id, 'following', 1)
+        timeline.add_author(instance.user_id, instance.author_id)
+    conditional.touch(conditional.author_scope(instance.author_id),
+                      conditional.author_scope(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.adjust(instance.author_id, 'followers', -1)
+    stats.adjust(instance.user_id, 'following', -1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    conditional.touch(conditional.author_scope(instance.author_id),
+                      conditional.author_scope(instance.user_id))
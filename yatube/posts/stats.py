@@ -0,0 +1,77 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def count_subquery(model, field):
+    counts = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(
+        Subquery(counts, output_field=IntegerField()), Value(0)
+    )
+
+
+def actual_counts():
+    return {
+        'followers': count_subquery(Follow, 'author'),
+        'following': count_subquery(Follow, 'user'),
+        'posts': count_subquery(Post, 'author'),
+        'comments': count_subquery(Comment, 'author'),
+    }
+
+
+def recount(user_id):
+    counts = User.objects.filter(pk=user_id).annotate(
+        **actual_counts()
+    ).values(*actual_counts()).first()
+    if counts is None:
+        return None
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=counts
+    )
+    return stats
+
+
+def for_user(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount(user.pk)
+
+
+def adjust(user_id, field, delta):
+    lookup = {'pk': user_id}
+    if delta < 0:
+        lookup[f'{field}__gte'] = -delta
+    updated = UserStats.objects.filter(**lookup).update(
+        **{field: F(field) + delta}
+    )
+    # Строку создаем только при росте счетчика: при удалении
+    # пользователя его статистика уже могла быть удалена каскадом
+    if not updated and delta > 0:
+        recount(user_id)
+
+
+def reconcile(dry_run=False):
+    """Пересчитывает расходящуюся статистику пачкой.
+
+    Возвращает число созданных строк и число исправленных.
+    """
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    created = [UserStats(user_id=pk) for pk in missing]
+    if not dry_run:
+        UserStats.objects.bulk_create(created, ignore_conflicts=True)
+    counts = actual_counts()
+    drift = UserStats.objects.annotate(
+        **{f'actual_{field}': value for field, value in counts.items()}
+    ).exclude(**{field: F(f'actual_{field}') for field in counts})
+    drifted = drift.count()
+    if drifted and not dry_run:
+        UserStats.objects.filter(pk__in=drift.values('pk')).update(
+            **counts
+        )
+    return len(created), drifted
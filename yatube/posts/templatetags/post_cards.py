@@ -0,0 +1,16 @@
+from django import template
+
+from posts import thumbnails
+from posts.fragments import post_card_key as make_post_card_key
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card_key(context, post):
+    return make_post_card_key(post, context.get('user'))
+
+
+@register.simple_tag
+def post_image(post):
+    return thumbnails.responsive(post.image)
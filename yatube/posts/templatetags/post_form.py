@@ -1,10 +1,26 @@
 from django import template
+from django.core.cache import cache
 
 from posts.forms import PostForm
+from posts.fragments import get_versions, groups_scope
 
 register = template.Library()
 
 
+def group_choices(form):
+    # Список тематик одинаков для всех форм на странице, поэтому
+    # берется из кеша, а не запрашивается для каждого поста
+    version, = get_versions(groups_scope)
+    key = f'post_form:group_choices:{version}'
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(iter(form.fields['group'].choices))
+        cache.set(key, choices)
+    return choices
+
+
 @register.simple_tag
 def post_form(post=None):
-    return PostForm(instance=post)
+    form = PostForm(instance=post)
+    form.fields['group'].choices = group_choices(form)
+    return form
@@ -0,0 +1,153 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.buffers import page_hits, post_views, take
+from posts.models import Ip, PageHit, Post, User
+
+
+@override_settings(
+    PAGE_HITS={'FLUSH_SIZE': 100, 'FLUSH_INTERVAL': 3600},
+    ANALYTICS_EVENTS={'ENABLED': False},
+)
+class PageHitBufferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        page_hits.flush()
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_hits_are_buffered_until_flush(self):
+        for _ in range(3):
+            self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(PageHit.objects.exists())
+        self.assertEqual(page_hits.flush(), 3)
+        hit = PageHit.objects.get(client=self.user, url='/')
+        self.assertEqual(hit.count, 3)
+
+    def test_flush_increments_existing_counter(self):
+        PageHit.objects.create(client=self.user, url='/', count=5)
+        page_hits.add((self.user.pk, '/'))
+        page_hits.add((self.user.pk, '/follow/'), 2)
+        page_hits.flush()
+        self.assertEqual(PageHit.objects.get(url='/').count, 6)
+        self.assertEqual(PageHit.objects.get(url='/follow/').count, 2)
+
+    def test_guest_hits_are_not_counted(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(page_hits.flush(), 0)
+
+    @override_settings(PAGE_HITS={'FLUSH_SIZE': 2, 'FLUSH_INTERVAL': 3600})
+    def test_flush_when_size_reached(self):
+        page_hits.add((self.user.pk, '/'))
+        self.assertFalse(PageHit.objects.exists())
+        page_hits.add((self.user.pk, '/'))
+        self.assertEqual(PageHit.objects.get(url='/').count, 2)
+
+    @override_settings(PAGE_HITS={
+        'BACKEND': 'cache', 'FLUSH_SIZE': 100, 'FLUSH_INTERVAL': 3600,
+    })
+    def test_cache_backend(self):
+        page_hits.add((self.user.pk, '/'))
+        page_hits.add((self.user.pk, '/'))
+        self.assertFalse(PageHit.objects.exists())
+        page_hits.flush()
+        self.assertEqual(PageHit.objects.get(url='/').count, 2)
+
+    @override_settings(PAGE_HITS={
+        'BACKEND': 'cache', 'FLUSH_SIZE': 100, 'FLUSH_INTERVAL': 3600,
+    })
+    def test_cache_backend_keeps_hits_of_evicted_counter(self):
+        page_hits.add((self.user.pk, '/'))
+        with mock.patch.object(cache, 'incr', side_effect=ValueError):
+            page_hits.add((self.user.pk, '/'))
+        self.assertEqual(page_hits.flush(), 2)
+        self.assertEqual(PageHit.objects.get(url='/').count, 2)
+
+    @override_settings(PAGE_HITS={
+        'BACKEND': 'cache', 'FLUSH_SIZE': 100, 'FLUSH_INTERVAL': 3600,
+    })
+    def test_cache_backend_deletes_drained_keys(self):
+        page_hits.add((self.user.pk, '/'))
+        page_hits.flush()
+        page_hits.add((self.user.pk, '/follow/'))
+        page_hits.flush()
+        page_hits.flush()
+        self.assertEqual(PageHit.objects.get(url='/').count, 1)
+        self.assertEqual(PageHit.objects.get(url='/follow/').count, 1)
+        for generation in (0, 1):
+            self.assertIsNone(cache.get(f'page_hits:{generation}:slots'))
+
+    def test_take_returns_only_what_is_left(self):
+        cache.set('counter', 3)
+        self.assertEqual(take('counter', 5), 3)
+        self.assertEqual(cache.get('counter'), 0)
+
+    def test_flush_command(self):
+        page_hits.add((self.user.pk, '/'))
+        out = StringIO()
+        call_command('flush_page_hits', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(PageHit.objects.get(url='/').count, 1)
+
+
+@override_settings(
+    POST_VIEWS={'FLUSH_SIZE': 100, 'FLUSH_INTERVAL': 3600},
+    ANALYTICS_EVENTS={'ENABLED': False},
+)
+class PostViewBufferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='post_author')
+        cls.post = Post.objects.create(text='Текст', author=cls.user)
+
+    def setUp(self):
+        post_views.flush()
+        cache.clear()
+
+    def test_views_are_counted_once_per_ip(self):
+        url = reverse('posts:post', args=(self.user.username, self.post.id))
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.assertEqual(post_views.flush(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 2)
+        self.assertEqual(self.post.views.count(), 2)
+
+    def test_already_recorded_view_is_not_counted(self):
+        self.post.views.add(Ip.objects.create(ip='127.0.0.1'))
+        post_views.record(self.post.pk, '127.0.0.1')
+        post_views.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 0)
+        self.assertEqual(Ip.objects.count(), 1)
+
+    def test_concurrently_recorded_view_does_not_fail_the_batch(self):
+        Through = Post.views.through
+        bulk_create = Through.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # Пару успели записать в обход буфера после проверки
+            self.post.views.add(Ip.objects.get(ip='127.0.0.1'))
+            return bulk_create(objs, **kwargs)
+
+        post_views.record(self.post.pk, '127.0.0.1')
+        post_views.record(self.post.pk, '10.0.0.1')
+        with mock.patch.object(
+            Through.objects, 'bulk_create', side_effect=racing_bulk_create
+        ):
+            self.assertEqual(post_views.flush(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 2)
+        self.assertEqual(self.post.views.count(), 2)
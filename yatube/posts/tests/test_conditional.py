@@ -0,0 +1,176 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from posts import conditional, decorators
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='post_author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Текст поста', author=self.author, group=self.group
+        )
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_slug', args=[self.group.slug]),
+            'profile': reverse('posts:profile', args=[self.author.username]),
+            'post': reverse(
+                'posts:post', args=[self.author.username, self.post.pk]
+            ),
+        }
+
+    def revalidate(self, url, response, client=None):
+        client = client or self.guest_client
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_return_304(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.has_header('Last-Modified'))
+                cached = self.revalidate(url, response)
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached['ETag'], response['ETag'])
+                self.assertEqual(cached.content, b'')
+
+    def test_if_modified_since(self):
+        url = self.urls['profile']
+        response = self.guest_client.get(url)
+        cached = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(cached.status_code, 304)
+        stale = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(0)
+        )
+        self.assertEqual(stale.status_code, 200)
+
+    def test_comment_changes_post_and_feeds(self):
+        responses = {
+            name: self.guest_client.get(url)
+            for name, url in self.urls.items()
+        }
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertEqual(
+                    self.revalidate(url, responses[name]).status_code, 200
+                )
+
+    def test_post_moved_out_of_group_changes_group_page(self):
+        url = self.urls['group']
+        response = self.guest_client.get(url)
+        self.post.group = None
+        self.post.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_other_author_posts_do_not_change_profile(self):
+        url = self.urls['profile']
+        response = self.guest_client.get(url)
+        Post.objects.create(text='Чужой пост', author=self.reader)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_follow_changes_profile(self):
+        url = self.urls['profile']
+        response = self.reader_client.get(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        revalidated = self.revalidate(url, response, self.reader_client)
+        self.assertEqual(revalidated.status_code, 200)
+
+    def test_cached_index_matches_its_etag(self):
+        url = self.urls['index']
+        response = self.guest_client.get(url)
+        Post.objects.create(text='Новый пост', author=self.author)
+        # Закешированная страница отдается вместе со своим ETag
+        cached = self.guest_client.get(url)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertNotContains(cached, 'Новый пост')
+        cache.clear()
+        fresh = self.guest_client.get(url)
+        self.assertNotEqual(fresh['ETag'], response['ETag'])
+        self.assertContains(fresh, 'Новый пост')
+
+    def test_edit_button_expiry_changes_author_pages(self):
+        author_client = Client()
+        author_client.force_login(self.author)
+        url = self.urls['index']
+        response = author_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.revalidate(url, response, author_client)
+        self.assertEqual(cached.status_code, 304)
+        # Свежие посты автора берутся из кеша, а не считаются запросом
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'COUNT' in query['sql'] or '"pub_date" >=' in query['sql']
+        ])
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch.object(conditional.timezone, 'now',
+                               return_value=later):
+            expired = self.revalidate(url, response, author_client)
+        self.assertEqual(expired.status_code, 200)
+
+    def test_login_does_not_change_pages(self):
+        url = self.urls['index']
+        response = self.guest_client.get(url)
+        Client().force_login(self.author)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_authenticated_pages_are_private(self):
+        url = self.urls['index']
+        guest = self.guest_client.get(url)
+        reader = self.reader_client.get(url)
+        self.assertNotEqual(guest['ETag'], reader['ETag'])
+        self.assertIn('private', reader['Cache-Control'])
+        self.assertNotIn('private', guest['Cache-Control'])
+        self.assertIn('Cookie', reader['Vary'])
+        self.assertEqual(self.revalidate(url, reader).status_code, 200)
+        cached = self.revalidate(url, reader, self.reader_client)
+        self.assertEqual(cached.status_code, 304)
+        self.assertIn('private', cached['Cache-Control'])
+
+    def test_not_modified_post_still_counts_view(self):
+        url = self.urls['post']
+        response = self.guest_client.get(url)
+        with mock.patch.object(decorators.events, 'record_view') as record:
+            self.assertEqual(
+                self.revalidate(url, response).status_code, 304
+            )
+        record.assert_called_once_with(self.post.pk, '127.0.0.1')
+
+    def test_missing_page_has_no_validators(self):
+        response = self.guest_client.get(
+            reverse('posts:profile', args=['nobody'])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    @override_settings(CONDITIONAL_GET={'ENABLED': False})
+    def test_can_be_disabled(self):
+        response = self.guest_client.get(self.urls['index'])
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,163 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from posts.models import Post, User
+from yatube import routers
+from yatube.routers import ReadWriteRouter, use_primary
+from yatube.sqlite3.base import DatabaseWrapper
+
+
+def pragma(conn, name):
+    with conn.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@override_settings(SQLITE_PRAGMAS={'busy_timeout': 100})
+class SqlitePragmasTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+        self.connections = []
+
+    def tearDown(self):
+        for conn in self.connections:
+            conn.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def connect(self, **options):
+        conn = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': self.path,
+             'OPTIONS': options},
+            alias='pragmas',
+        )
+        self.connections.append(conn)
+        return conn
+
+    def test_pragmas_applied_on_connect(self):
+        conn = self.connect()
+        self.assertEqual(pragma(conn, 'journal_mode'), 'wal')
+        # 1 - NORMAL
+        self.assertEqual(pragma(conn, 'synchronous'), 1)
+        self.assertEqual(pragma(conn, 'busy_timeout'), 100)
+        self.assertEqual(pragma(conn, 'cache_size'), -64 * 1024)
+
+    def test_read_only_connection_rejects_writes(self):
+        writer = self.connect()
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE note (text TEXT)')
+        reader = self.connect(read_only=True)
+        with self.assertRaises(OperationalError):
+            with reader.cursor() as cursor:
+                cursor.execute("INSERT INTO note VALUES ('x')")
+
+    def test_transactions_take_write_lock_immediately(self):
+        writer = self.connect()
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE note (text TEXT)')
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        # Транзакция еще ничего не записала, но блокировка уже взята
+        writer._start_transaction_under_autocommit()
+        with self.assertRaises(sqlite3.OperationalError):
+            other.execute("INSERT INTO note VALUES ('x')")
+        with writer.cursor() as cursor:
+            cursor.execute('ROLLBACK')
+
+
+class ReadWriteRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadWriteRouter()
+
+    def test_reads_go_to_reader(self):
+        self.assertEqual(self.router.db_for_read(None), 'reader')
+        self.assertEqual(self.router.db_for_write(None), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('reader', 'posts'))
+
+    def test_reads_stay_on_writer_inside_transaction(self):
+        with mock.patch.object(connection, 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(None), 'default')
+
+
+@override_settings(
+    DATABASE_ROUTERS=['yatube.routers.ReplicaRouter'],
+    DATABASE_REPLICAS={'ALIASES': ['replica'], 'STICKY_SECONDS': 30},
+)
+class ReplicaRouterTest(TestCase):
+    """Реплика - копия тестовой базы до начала теста.
+
+    Всё, что создает тест, остается в незафиксированной транзакции
+    default и на реплике не видно, как при отставании репликации.
+    """
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        path = os.path.join(cls.directory, 'replica.sqlite3')
+        connection.ensure_connection()
+        replica = sqlite3.connect(path)
+        connection.connection.backup(replica)
+        replica.close()
+        connections.databases['replica'] = {
+            **connection.settings_dict,
+            'NAME': path,
+            'OPTIONS': {'read_only': True},
+        }
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='post_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+        delattr(connections._connections, 'replica')
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        routers.unpin()
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(Post.objects.all().db, 'replica')
+        Post.objects.create(text='Текст поста', author=self.author)
+        # Запись закрепляет за основной базой только свой поток
+        self.assertEqual(Post.objects.all().db, 'default')
+        routers.unpin()
+        response = APIClient().get('/api/v1/posts/')
+        self.assertEqual(response.data['results'], [])
+
+    def test_writer_reads_own_posts(self):
+        response = self.author_client.post(
+            '/api/v1/posts/', {'text': 'Новый пост'}
+        )
+        self.assertEqual(response.status_code, 201)
+        cookie = response.cookies['db_primary']
+        self.assertEqual(cookie['max-age'], 30)
+        own = self.author_client.get('/api/v1/posts/')
+        self.assertEqual(len(own.data['results']), 1)
+        other = APIClient().get('/api/v1/posts/')
+        self.assertEqual(other.data['results'], [])
+
+    def test_reads_do_not_pin_client(self):
+        response = self.author_client.get('/api/v1/posts/')
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_background_writes_do_not_pin_client(self):
+        with use_primary():
+            self.assertEqual(Post.objects.all().db, 'default')
+            Post.objects.create(text='Текст поста', author=self.author)
+        self.assertFalse(routers.is_pinned())
+        self.assertEqual(Post.objects.all().db, 'replica')
@@ -0,0 +1,127 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import events
+from posts.models import Event, PageHit, Post, User
+
+
+def run_now(callback):
+    callback()
+
+
+@override_settings(ANALYTICS_EVENTS={
+    'ASYNC': False, 'BATCH_SIZE': 100, 'QUEUE_SIZE': 100,
+})
+class EventPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        events.pipeline.flush()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get(self, client, url, **extra):
+        with mock.patch.object(
+            events.transaction, 'on_commit', side_effect=run_now
+        ):
+            return client.get(url, **extra)
+
+    def test_views_emit_events_instead_of_writing(self):
+        post_url = reverse('posts:post', args=[self.user.username,
+                                               self.post.pk])
+        self.get(self.authorized_client, reverse('posts:index'))
+        self.get(self.authorized_client, reverse('posts:index'))
+        self.get(self.client, post_url)
+        self.get(self.client, post_url)
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(PageHit.objects.exists())
+        self.assertEqual(events.pipeline.flush(), 3)
+        self.assertEqual(events.rollup(), 3)
+        self.assertEqual(PageHit.objects.get(url='/').count, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 1)
+
+    def test_events_wait_for_commit(self):
+        with mock.patch.object(events.transaction, 'on_commit') as hook:
+            events.record_hit(self.user.pk, '/')
+        hook.assert_called_once()
+        self.assertEqual(events.pipeline.stats()['pending'], 0)
+
+    def test_rollup_processes_each_event_once(self):
+        pipeline = events.EventPipeline()
+        pipeline.put(Event(kind=Event.HIT, client_id=self.user.pk, url='/'))
+        pipeline.flush()
+        self.assertEqual(events.rollup(), 1)
+        self.assertEqual(events.rollup(), 0)
+        self.assertEqual(PageHit.objects.get(url='/').count, 1)
+
+    @override_settings(ANALYTICS_EVENTS={
+        'ASYNC': False, 'QUEUE_SIZE': 2, 'BATCH_SIZE': 100,
+        'OVERFLOW': 'drop',
+    })
+    def test_full_queue_drops_events(self):
+        pipeline = events.EventPipeline()
+        for _ in range(5):
+            pipeline.put(Event(kind=Event.HIT, client_id=1, url='/'))
+        stats = pipeline.stats()
+        self.assertEqual(stats['queued'], 2)
+        self.assertEqual(stats['dropped'], 3)
+
+    @override_settings(ANALYTICS_EVENTS={
+        'ASYNC': False, 'QUEUE_SIZE': 10, 'BATCH_SIZE': 100,
+        'OVERFLOW': 'sample', 'SAMPLE_FROM': 0.5, 'SAMPLE_EVERY': 2,
+    })
+    def test_sampled_events_keep_total_weight(self):
+        pipeline = events.EventPipeline()
+        for _ in range(9):
+            pipeline.put(Event(
+                kind=Event.HIT, client_id=self.user.pk, url='/'
+            ))
+        self.assertEqual(pipeline.stats()['sampled'], 2)
+        pipeline.flush()
+        events.rollup()
+        # 5 событий записаны как есть, из 4 остальных - каждое второе
+        # с весом 2
+        self.assertEqual(PageHit.objects.get(url='/').count, 9)
+
+    @override_settings(ANALYTICS_EVENTS={
+        'ASYNC': False, 'QUEUE_SIZE': 2, 'BATCH_SIZE': 100,
+        'OVERFLOW': 'sample', 'SAMPLE_FROM': 0.5, 'SAMPLE_EVERY': 10,
+    })
+    def test_views_are_not_sampled(self):
+        def view(ip):
+            return Event(kind=Event.VIEW, post_id=self.post.pk, ip=ip)
+
+        pipeline = events.EventPipeline()
+        pipeline.put(Event(kind=Event.HIT, client_id=self.user.pk, url='/'))
+        pipeline.put(view('1.1.1.1'))
+        self.assertEqual(pipeline.stats()['queued'], 2)
+        # Отброшенный просмотр не считается увиденным
+        pipeline.put(view('2.2.2.2'))
+        self.assertEqual(pipeline.stats()['dropped'], 1)
+        pipeline.flush()
+        pipeline.put(view('2.2.2.2'))
+        pipeline.put(view('2.2.2.2'))
+        pipeline.flush()
+        events.rollup()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 2)
+
+    def test_rollup_command(self):
+        events.pipeline.put(Event(
+            kind=Event.HIT, client_id=self.user.pk, url='/'
+        ))
+        out = StringIO()
+        call_command('rollup_events', stdout=out)
+        self.assertIn('Обработано событий: 1', out.getvalue())
+        self.assertEqual(PageHit.objects.get(url='/').count, 1)
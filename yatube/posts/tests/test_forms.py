@@ -378,3 +378,19 @@ class CommentPostCreateTest(TestCase):
         redirect = login + '?next=' + post
         self.assertRedirects(response, redirect)
         self.assertEqual(self.post.comments.count(), 0)
+
+
+class SignUpFormTest(TestCase):
+    def test_route_names_are_reserved(self):
+        form_data = {
+            'username': 'Search',
+            'email': 'search@example.com',
+            'password1': 'Sup3r-secret-pass',
+            'password2': 'Sup3r-secret-pass',
+        }
+        response = Client().post(reverse('signup'), data=form_data)
+        self.assertFormError(
+            response, 'form', 'username',
+            'Это имя занято адресом сайта, выберите другое',
+        )
+        self.assertFalse(User.objects.filter(username='Search').exists())
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='post_author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Исходный текст', author=self.author, group=self.group
+        )
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def get_profile(self, client):
+        return client.get(reverse('posts:profile',
+                                  kwargs={'username': self.author.username}))
+
+    def test_card_is_served_from_cache(self):
+        self.get_profile(self.reader_client)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        self.assertContains(self.get_profile(self.reader_client),
+                            'Исходный текст')
+
+    def test_edit_invalidates_card(self):
+        self.get_profile(self.reader_client)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertContains(self.get_profile(self.reader_client),
+                            'Новый текст')
+
+    def test_comment_invalidates_card(self):
+        self.get_profile(self.reader_client)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.assertContains(self.get_profile(self.reader_client),
+                            'Комментариев: 1')
+
+    def test_group_change_invalidates_card(self):
+        self.get_profile(self.reader_client)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(self.get_profile(self.reader_client),
+                            'Новое название')
+
+    def test_author_and_reader_get_different_cards(self):
+        self.get_profile(self.reader_client)
+        self.assertContains(self.get_profile(self.author_client),
+                            'Редактировать')
+        self.assertNotContains(self.get_profile(self.reader_client),
+                               'Редактировать')
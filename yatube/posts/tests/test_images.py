@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post, User
+
+
+def make_jpeg(width, height):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    # Ориентация: повернуть на 90 градусов
+    exif[0x0112] = 6
+    exif[0x010F] = 'Камера'
+    Image.new('RGB', (width, height), 'red').save(
+        buffer, 'JPEG', exif=exif.tobytes()
+    )
+    return SimpleUploadedFile(
+        name='photo.jpg', content=buffer.getvalue(),
+        content_type='image/jpeg',
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    IMAGE_UPLOADS={'MAX_SIDE': 400, 'MAX_PIXELS': 4000 * 4000},
+)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='post_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.client.post(
+            reverse('posts:new_post'), data={'text': 'Текст', 'image': image}
+        )
+
+    def test_large_photo_is_downscaled_and_stripped(self):
+        self.create_post(make_jpeg(1600, 1200))
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        # Учтена ориентация из EXIF, большая сторона уменьшена
+        self.assertEqual((post.image_width, post.image_height), (300, 400))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (300, 400))
+            self.assertFalse(image.getexif())
+
+    def test_gif_is_stored_as_is(self):
+        self.create_post(SimpleUploadedFile(
+            name='small.gif',
+            content=(
+                b'\x47\x49\x46\x38\x39\x61\x01\x00'
+                b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+                b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+                b'\x00\x00\x01\x00\x01\x00\x00\x02'
+                b'\x02\x4c\x01\x00\x3b'
+            ),
+            content_type='image/gif',
+        ))
+        post = Post.objects.get()
+        self.assertEqual(post.image.name, 'posts/small.gif')
+        self.assertEqual((post.image_width, post.image_height), (1, 1))
+
+    def test_oversized_upload_is_rejected(self):
+        with override_settings(IMAGE_UPLOADS={'MAX_PIXELS': 1000 * 1000}):
+            response = self.create_post(make_jpeg(1600, 1200))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большое разрешение изображения',
+        )
+        self.assertFalse(Post.objects.exists())
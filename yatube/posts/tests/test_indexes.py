@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from posts.management.commands import index_advisor
+from posts.models import Ip, PageHit, User
+
+
+class IndexAdvisorTest(TestCase):
+    def test_canonical_queries_do_not_scan_tables(self):
+        out = StringIO()
+        call_command('index_advisor', strict=True, stdout=out)
+        output = out.getvalue()
+        self.assertIn('post_group_pub_date_idx', output)
+        self.assertIn('comment_post_created_idx', output)
+
+    def test_full_scan_detection(self):
+        plan = [
+            'SCAN posts_post',
+            'SCAN TABLE posts_group',
+            'SCAN posts_post USING INDEX post_pub_date_idx',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)',
+        ]
+        self.assertEqual(
+            index_advisor.full_scans(plan), ['posts_post', 'posts_group']
+        )
+
+    def test_sorted_index_scan_is_a_full_scan(self):
+        plan = [
+            'SCAN posts_post USING INDEX post_pub_date_idx',
+            'USE TEMP B-TREE FOR GROUP BY',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(index_advisor.full_scans(plan), ['posts_post'])
+        plan[1:] = ['USE TEMP B-TREE FOR RIGHT PART OF ORDER BY']
+        self.assertEqual(index_advisor.full_scans(plan), [])
+
+    def test_hits_and_ips_are_unique(self):
+        user = User.objects.create_user(username='reader')
+        PageHit.objects.create(client=user, url='/')
+        Ip.objects.create(ip='127.0.0.1')
+        for model, fields in ((PageHit, {'client': user, 'url': '/'}),
+                              (Ip, {'ip': '127.0.0.1'})):
+            with self.subTest(model=model.__name__):
+                with self.assertRaises(IntegrityError):
+                    with transaction.atomic():
+                        model.objects.create(**fields)
@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import analytics, thumbnails, urls
+from posts.buffers import flush_all
+from posts.models import (Comment, Follow, Group, HitRollup, Post, User,
+                          ViewRollup)
+from yatube.querybudget import QueryBudgetExceeded
+
+small_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    QUERY_BUDGETS={**settings.QUERY_BUDGETS, 'RAISE': True},
+    PAGE_HITS={'FLUSH_SIZE': 1000, 'FLUSH_INTERVAL': 3600},
+    POST_VIEWS={'FLUSH_SIZE': 1000, 'FLUSH_INTERVAL': 3600},
+)
+class PostsQueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='post_author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        for i in range(12):
+            post = Post.objects.create(
+                text='Пост №' + str(i),
+                author=cls.author,
+                group=cls.group,
+                image=SimpleUploadedFile(
+                    name=f'small_{i}.gif',
+                    content=small_gif,
+                    content_type='image/gif',
+                ),
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий'
+            )
+            # Миниатюры создает пул потоков после коммита, которого в
+            # TestCase нет: без этого карточки показывали бы оригинал
+            thumbnails.generate(post.image)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = post
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        for i, post in enumerate(Post.objects.all()):
+            ViewRollup.objects.create(
+                period=ViewRollup.DAY, start=analytics.day_start(
+                    timezone.now()
+                ), post=post, count=i,
+            )
+            HitRollup.objects.create(
+                period=HitRollup.DAY, start=analytics.day_start(
+                    timezone.now()
+                ), url=f'/{i}/', count=i,
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        flush_all()
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_every_route_has_budget(self):
+        for pattern in urls.urlpatterns:
+            with self.subTest(name=pattern.name):
+                self.assertIn(f'posts:{pattern.name}',
+                              settings.QUERY_BUDGETS['VIEWS'])
+
+    def test_routes_within_budget(self):
+        username = self.author.username
+        post_kwargs = {'username': username, 'post_id': self.post.id}
+        requests = (
+            ('get', reverse('posts:index'), self.reader_client),
+            ('get', reverse('posts:index'), self.author_client),
+            ('get', reverse('posts:index'), self.client),
+            ('get', reverse('posts:group_slug', args=(self.group.slug,)),
+             self.reader_client),
+            ('get', reverse('posts:new_post'), self.author_client),
+            ('post', reverse('posts:new_post'), self.author_client),
+            ('get', reverse('posts:follow_index'), self.reader_client),
+            ('get', reverse('posts:search') + '?q=Пост', self.reader_client),
+            ('get', reverse('posts:statistics'), self.staff_client),
+            ('get', reverse('posts:profile', args=(username,)),
+             self.reader_client),
+            ('get', reverse('posts:profile', args=(username,)),
+             self.author_client),
+            ('get', reverse('posts:post', kwargs=post_kwargs),
+             self.reader_client),
+            ('get', reverse('posts:post_edit', kwargs=post_kwargs),
+             self.author_client),
+            ('post', reverse('posts:add_comment', kwargs=post_kwargs),
+             self.reader_client),
+            ('get', reverse('posts:profile_unfollow', args=(username,)),
+             self.reader_client),
+            ('get', reverse('posts:profile_follow', args=(username,)),
+             self.reader_client),
+            ('get', reverse('posts:post_delete', kwargs=post_kwargs),
+             self.author_client),
+        )
+        for method, url, client in requests:
+            with self.subTest(method=method, url=url):
+                cache.clear()
+                getattr(client, method)(
+                    url, {'text': 'Текст'} if method == 'post' else None,
+                    HTTP_REFERER='/',
+                )
+
+    def test_exceeded_budget_raises(self):
+        budgets = {
+            **settings.QUERY_BUDGETS,
+            'RAISE': True,
+            'VIEWS': {'posts:index': 1},
+        }
+        with override_settings(QUERY_BUDGETS=budgets):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:index'))
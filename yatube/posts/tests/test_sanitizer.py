@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from posts.sanitizer import sanitize
+
+
+class SanitizerTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='posts_author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sanitize(self):
+        cases = {
+            '<p onclick="x()">Текст</p>': '<p>Текст</p>',
+            '<script>alert(1)</script>ok': 'ok',
+            '<a href="javascript:alert(1)">ссылка</a>': '<a>ссылка</a>',
+            '<a href=" JaVa\tScript:x">ссылка</a>': '<a>ссылка</a>',
+            '<a href="https://ya.ru" target="_blank">ya</a>':
+                '<a href="https://ya.ru">ya</a>',
+            '<img src="/media/a.png" onerror="x()">':
+                '<img src="/media/a.png">',
+            '<b><i>незакрыто</b>': '<b><i>незакрыто</i></b>',
+            '1 &lt; 2 <unknown>тег</unknown>': '1 &lt; 2 тег',
+            '<p title="&quot;>">x</p>': '<p>x</p>',
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(sanitize(value), expected)
+
+    def test_html_is_sanitized_once_on_save(self):
+        post = Post.objects.create(
+            text='<p>Текст<script>alert(1)</script></p>', author=self.author
+        )
+        self.assertEqual(post.text_html, '<p>Текст</p>')
+        digest = post.text_hash
+        post.save()
+        self.assertEqual(post.text_hash, digest)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, '<p>Текст</p>')
+        self.assertNotContains(response, 'alert(1)')
+
+    def test_form_and_comment_are_sanitized(self):
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('posts:new_post'), {
+            'text': '<p style="x" onmouseover="y">Пост</p>',
+        })
+        post = Post.objects.get()
+        self.assertEqual(post.text_html, '<p>Пост</p>')
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='<iframe src="x"></iframe>Ок'
+        )
+        self.assertEqual(comment.text_html, 'Ок')
+
+    def test_resanitize_after_allowlist_change(self):
+        post = Post.objects.create(
+            text='<p><b>Жирный</b></p>', author=self.author
+        )
+        allowlist = {'TAGS': ('p',), 'ATTRIBUTES': {}}
+        with override_settings(HTML_SANITIZER=allowlist):
+            out = StringIO()
+            call_command('resanitize_html', stdout=out)
+            post.refresh_from_db()
+            self.assertEqual(post.text_html, '<p>Жирный</p>')
+            self.assertIn('Обновлено постов: 1', out.getvalue())
+            call_command('resanitize_html', stdout=out)
+            self.assertIn('Обновлено постов: 0', out.getvalue())
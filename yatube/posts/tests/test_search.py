@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+from posts.search import search_ids
+
+
+class SearchIndexTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='posts_author')
+        cls.group = Group.objects.create(
+            title='Котики', slug='cats', description='Про котиков'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_follows_create_edit_and_delete(self):
+        post = Post.objects.create(
+            text='<p>Белый &amp; пушистый кот</p>', author=self.author
+        )
+        self.assertEqual(search_ids('post', 'пушист'), [post.pk])
+        # Разметка не индексируется
+        self.assertEqual(search_ids('post', 'amp'), [])
+        post.text = 'Черный пес'
+        post.save()
+        self.assertEqual(search_ids('post', 'кот'), [])
+        self.assertEqual(search_ids('post', 'ПЕС'), [post.pk])
+        post.delete()
+        self.assertEqual(search_ids('post', 'пес'), [])
+
+    def test_group_and_author_are_searchable(self):
+        post = Post.objects.create(
+            text='Текст', author=self.author, group=self.group
+        )
+        self.assertEqual(search_ids('post', 'котики'), [post.pk])
+        self.assertEqual(search_ids('post', 'posts_author'), [post.pk])
+        self.group.title = 'Собачки'
+        self.group.save()
+        self.assertEqual(search_ids('post', 'котики'), [])
+        self.group.delete()
+        self.assertEqual(search_ids('post', 'собачки'), [])
+
+    def test_author_rename_is_reindexed(self):
+        author = User.objects.create_user(username='old_name')
+        post = Post.objects.create(text='Текст', author=author)
+        comment = Comment.objects.create(
+            post=post, author=author, text='Комментарий'
+        )
+        author.username = 'new_name'
+        author.save()
+        self.assertEqual(search_ids('post', 'old_name'), [])
+        self.assertEqual(search_ids('post', 'new_name'), [post.pk])
+        self.assertEqual(search_ids('comment', 'new_name'), [comment.pk])
+
+    def test_results_are_ranked(self):
+        once = Post.objects.create(
+            text='кот и длинный текст про что-то ещё', author=self.author
+        )
+        often = Post.objects.create(text='кот кот кот', author=self.author)
+        self.assertEqual(search_ids('post', 'кот'), [often.pk, once.pk])
+
+    def test_query_syntax_is_not_interpreted(self):
+        Post.objects.create(text='Текст', author=self.author)
+        self.assertEqual(search_ids('post', '" OR NEAR( *'), [])
+
+    def test_comments_are_indexed(self):
+        post = Post.objects.create(text='Текст', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='Отличный пост'
+        )
+        self.assertEqual(search_ids('comment', 'отличн'), [comment.pk])
+        post.delete()
+        self.assertEqual(search_ids('comment', 'отличн'), [])
+
+    @override_settings(SEARCH={'BACKEND': 'posts.search.DatabaseBackend'})
+    def test_database_backend(self):
+        post = Post.objects.create(text='Белый кот', author=self.author)
+        self.assertEqual(search_ids('post', 'кот'), [post.pk])
+
+
+class SearchPageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='posts_author')
+        for i in range(12):
+            Post.objects.create(text=f'Кот номер {i}', author=cls.author)
+        Post.objects.create(text='Собака', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_search_page_paginates_matches(self):
+        url = reverse('posts:search')
+        response = Client().get(url, {'q': 'кот'})
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertTrue(response.context['page'].has_next())
+        response = Client().get(url, {'q': 'кот', 'page': 2})
+        self.assertEqual(len(response.context['page']), 2)
+        self.assertFalse(response.context['page'].has_next())
+
+    def test_empty_query(self):
+        response = Client().get(reverse('posts:search'))
+        self.assertEqual(len(response.context['page']), 0)
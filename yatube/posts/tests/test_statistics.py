@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from posts import analytics, events
+from posts.models import Event, EventCursor, HitRollup, Post, User, ViewRollup
+
+
+class StatisticsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='post_author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.post = Post.objects.create(text='Текст поста', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def log(self, kind, created=None, **fields):
+        return Event.objects.create(
+            kind=kind, created=created or self.now, **fields
+        )
+
+    def test_aggregate_adds_events_to_hour_and_day(self):
+        self.log(Event.HIT, client_id=self.author.pk, url='/')
+        self.log(Event.HIT, client_id=self.staff.pk, url='/', weight=10)
+        self.log(Event.VIEW, post_id=self.post.pk, ip='127.0.0.1')
+        self.assertEqual(analytics.aggregate(), 3)
+        self.log(Event.HIT, created=self.now - timedelta(days=1), url='/')
+        self.assertEqual(analytics.aggregate(), 1)
+        self.assertEqual(analytics.aggregate(), 0)
+        today = analytics.day_start(self.now)
+        self.assertEqual(HitRollup.objects.get(
+            period=HitRollup.HOUR, start=analytics.hour_start(self.now)
+        ).count, 11)
+        self.assertEqual(HitRollup.objects.get(
+            period=HitRollup.DAY, start=today
+        ).count, 11)
+        self.assertEqual(HitRollup.objects.filter(
+            period=HitRollup.DAY
+        ).count(), 2)
+        self.assertEqual(
+            ViewRollup.objects.get(period=ViewRollup.DAY, start=today).count, 1
+        )
+
+    def test_aggregate_skips_deleted_posts(self):
+        self.log(Event.VIEW, post_id=self.post.pk + 1, ip='127.0.0.1')
+        self.assertEqual(analytics.aggregate(), 1)
+        self.assertFalse(ViewRollup.objects.exists())
+
+    def test_compact_keeps_recent_and_unprocessed_data(self):
+        old = self.now - timedelta(days=30)
+        processed = self.log(Event.HIT, created=old, url='/')
+        self.log(Event.HIT, created=old, url='/')
+        EventCursor.objects.create(
+            name=EventCursor.COUNTERS, position=processed.pk
+        )
+        analytics.aggregate()
+        for period in (HitRollup.HOUR, HitRollup.DAY):
+            HitRollup.objects.create(
+                period=period, start=self.now - timedelta(days=400), url='/'
+            )
+        deleted = analytics.compact(self.now)
+        self.assertEqual(deleted['posts.Event'], 1)
+        self.assertEqual(deleted['posts.HitRollup'], 3)
+        self.assertEqual(
+            list(HitRollup.objects.values_list('period', 'count')),
+            [(HitRollup.DAY, 2)],
+        )
+
+    def test_report_uses_requested_window(self):
+        today = analytics.day_start(self.now)
+        for days_ago, url, count in ((0, '/', 1), (0, '/follow/', 5),
+                                     (3, '/', 10)):
+            HitRollup.objects.create(
+                period=HitRollup.DAY, url=url, count=count,
+                start=today - timedelta(days=days_ago),
+            )
+        self.assertEqual(
+            analytics.report(days=1)['urls'], [('/follow/', 5), ('/', 1)]
+        )
+        self.assertEqual(
+            analytics.report(days=7)['urls'], [('/', 11), ('/follow/', 5)]
+        )
+
+    def test_statistics_page(self):
+        events.pipeline.put(Event(kind=Event.VIEW, post_id=self.post.pk))
+        events.pipeline.flush()
+        analytics.aggregate()
+        url = reverse('posts:statistics')
+        self.assertEqual(Client().get(url).status_code, 302)
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(url, {'days': 'много'})
+        self.assertEqual(response.context['days'], 7)
+        self.assertEqual(response.context['posts'], [(self.post, 1)])
+        self.assertContains(response, 'Просмотров за этот период нет', 0)
+
+    def test_statistics_api(self):
+        HitRollup.objects.create(
+            period=HitRollup.HOUR, url='/', count=3,
+            start=analytics.hour_start(self.now),
+        )
+        client = APIClient()
+        self.assertEqual(
+            client.get('/api/v1/statistics/').status_code, 401
+        )
+        client.force_authenticate(self.staff)
+        response = client.get('/api/v1/statistics/', {'hours': 1000})
+        self.assertEqual(response.data, {
+            'hours': 48, 'urls': [{'url': '/', 'hits': 3}], 'posts': [],
+        })
@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='posts_author')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_stats_created_with_user(self):
+        stats = self.stats(self.author)
+        self.assertEqual(
+            (stats.followers, stats.following, stats.posts, stats.comments),
+            (0, 0, 0, 0),
+        )
+
+    def test_follow_and_unfollow_update_counters(self):
+        url = reverse('posts:profile_follow',
+                      kwargs={'username': self.author.username})
+        self.follower_client.get(url)
+        # Повторная подписка не меняет счетчики
+        self.follower_client.get(url)
+        self.assertEqual(self.stats(self.author).followers, 1)
+        self.assertEqual(self.stats(self.follower).following, 1)
+        self.follower_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.stats(self.author).followers, 0)
+        self.assertEqual(self.stats(self.follower).following, 0)
+
+    def test_posts_and_comments_update_counters(self):
+        post = Post.objects.create(text='Текст', author=self.author)
+        Comment.objects.create(post=post, author=self.follower, text='Ок')
+        self.assertEqual(self.stats(self.author).posts, 1)
+        self.assertEqual(self.stats(self.follower).comments, 1)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts, 0)
+        self.assertEqual(self.stats(self.follower).comments, 0)
+
+    def test_profile_renders_stored_counters(self):
+        Post.objects.create(text='Текст', author=self.author)
+        Follow.objects.create(user=self.follower, author=self.author)
+        response = self.follower_client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}
+        ))
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Записей: 1')
+
+    def test_reconcile_repairs_drift(self):
+        Post.objects.create(text='Текст', author=self.author)
+        UserStats.objects.filter(user=self.author).update(posts=5)
+        UserStats.objects.filter(user=self.follower).delete()
+        out = StringIO()
+        call_command('reconcile_user_stats', '--dry-run', stdout=out)
+        self.assertEqual(self.stats(self.author).posts, 5)
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertEqual(self.stats(self.author).posts, 1)
+        self.assertTrue(UserStats.objects.filter(user=self.follower).exists())
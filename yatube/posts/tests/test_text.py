@@ -0,0 +1,52 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Post, User
+from posts.text import html_to_text, make_excerpt
+
+
+class PlainTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='posts_author')
+
+    def test_html_to_text(self):
+        value = (
+            '<p>Первый&nbsp;абзац &amp; <b>жирный</b></p>'
+            '<!-- заметка --><script>alert(1)</script>'
+            '<p>Второй<br/>абзац</p>'
+        )
+        self.assertEqual(
+            html_to_text(value), 'Первый абзац & жирный\nВторой\nабзац'
+        )
+
+    def test_excerpt_is_cut_on_word_boundary(self):
+        self.assertEqual(make_excerpt('один два три', 8), 'один…')
+        self.assertEqual(make_excerpt('один\nдва', 20), 'один два')
+
+    def test_fields_are_filled_on_save(self):
+        post = Post.objects.create(
+            text='<p>Текст <i>поста</i></p>', author=self.author
+        )
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='<p>Комментарий</p>'
+        )
+        self.assertEqual(post.text_plain, 'Текст поста')
+        self.assertEqual(str(post), 'Текст поста')
+        self.assertEqual(comment.excerpt, 'Комментарий')
+        post.text = '<p>Новый</p>'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Новый')
+
+    def test_backfill_command(self):
+        post = Post.objects.create(text='<p>Текст</p>', author=self.author)
+        Post.objects.filter(pk=post.pk).update(text_plain='', excerpt='')
+        call_command('backfill_plain_text', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.text_plain, post.excerpt), ('Текст', 'Текст')
+        )
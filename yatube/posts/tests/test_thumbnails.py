@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_png(width=2000, height=600):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'white').save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        name='big.png', content=buffer.getvalue(), content_type='image/png'
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='post_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.author, image=make_png()
+        )
+
+    def get_index(self):
+        return Client().get(reverse('posts:index'))
+
+    def test_original_is_served_until_thumbnails_are_ready(self):
+        result = thumbnails.responsive(self.post.image)
+        self.assertEqual(result, {'src': self.post.image.url, 'srcset': ''})
+        self.assertContains(self.get_index(), f'src="{self.post.image.url}"')
+
+    def test_generated_sizes_are_rendered_as_srcset(self):
+        generated = thumbnails.generate(self.post.image)
+        self.assertEqual(
+            [width for _, width in (
+                entry.split() for entry in generated['srcset'].split(', ')
+            )],
+            ['450w', '690w', '930w'],
+        )
+        cache.clear()
+        # Готовые миниатюры находятся в kv-store и без кеша
+        self.assertEqual(thumbnails.responsive(self.post.image), generated)
+        self.assertContains(
+            self.get_index(), f'srcset="{generated["srcset"]}"'
+        )
+
+    def test_page_thumbnails_are_loaded_in_one_query(self):
+        ready = Post.objects.create(
+            text='Пост с готовыми миниатюрами', author=self.author,
+            image=make_png(),
+        )
+        generated = thumbnails.generate(ready.image)
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.prefetch_posts([self.post, ready])
+            self.assertEqual(thumbnails.responsive(ready.image), generated)
+            # Отсутствие миниатюр тоже запоминается, без запроса на карточку
+            self.assertEqual(
+                thumbnails.responsive(self.post.image)['srcset'], ''
+            )
+
+    def test_saving_post_schedules_generation(self):
+        with mock.patch.object(thumbnails.transaction, 'on_commit') as hook:
+            self.post.save()
+        hook.assert_called_once()
+
+    def test_prewarm_command_processes_posts_with_images(self):
+        Post.objects.create(text='Без картинки', author=self.author)
+        with mock.patch(
+            'posts.management.commands.prewarm_thumbnails.run_in_worker',
+            return_value=True,
+        ) as worker:
+            out = StringIO()
+            call_command('prewarm_thumbnails', '--workers', '2', stdout=out)
+        worker.assert_called_once_with(self.post.image, self.post.pk)
+        self.assertIn('Обработано картинок: 1', out.getvalue())
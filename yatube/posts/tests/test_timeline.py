@@ -0,0 +1,120 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.timeline import follow_feed
+
+
+@override_settings(FOLLOW_FEED={'MATERIALIZED': True, 'FANOUT_LIMIT': 1})
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='posts_author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.post = Post.objects.create(text='Старый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def follow(self, user, author):
+        client = Client()
+        client.force_login(user)
+        client.get(reverse('posts:profile_follow',
+                           kwargs={'username': author.username}))
+
+    def feed(self):
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        return list(response.context['page'])
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        self.follow(self.follower, self.author)
+        self.assertEqual(TimelineEntry.objects.count(), 1)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed(), [new_post, self.post])
+        new_post.delete()
+        self.assertEqual(TimelineEntry.objects.count(), 1)
+
+    def test_unfollow_removes_author_posts(self):
+        self.follow(self.follower, self.author)
+        self.follower_client.get(reverse('posts:profile_unfollow',
+                                 kwargs={'username': self.author.username}))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_popular_author_is_read_on_demand(self):
+        self.follow(self.follower, self.author)
+        other = User.objects.create_user(username='other')
+        self.follow(other, self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists()
+        )
+        self.assertEqual(self.feed(), [new_post, self.post])
+        self.assertEqual(
+            follow_feed(other).window(limit=10), [new_post, self.post]
+        )
+
+    def test_popular_author_posts_leave_timelines(self):
+        self.follow(self.follower, self.author)
+        self.follow(User.objects.create_user(username='other'), self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [self.post])
+
+    def test_author_below_limit_is_backfilled(self):
+        other = User.objects.create_user(username='other')
+        self.follow(self.follower, self.author)
+        self.follow(other, self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        other_client = Client()
+        other_client.force_login(other)
+        other_client.get(reverse('posts:profile_unfollow',
+                                 kwargs={'username': self.author.username}))
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user', 'post')),
+            {(self.follower.pk, self.post.pk),
+             (self.follower.pk, new_post.pk)},
+        )
+
+    def test_feed_is_paged_by_keyset(self):
+        self.follow(self.follower, self.author)
+        celebrity = User.objects.create_user(username='celebrity')
+        self.follow(self.follower, celebrity)
+        self.follow(self.author, celebrity)
+        posts = [self.post]
+        for number in range(15):
+            author = celebrity if number % 2 else self.author
+            posts.append(Post.objects.create(
+                text=f'Пост {number}', author=author
+            ))
+        posts.reverse()
+        first = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(first.context['page']), posts[:10])
+        second = self.follower_client.get(
+            f'{reverse("posts:follow_index")}?'
+            f'{first.context["page"].next_query}'
+        )
+        self.assertEqual(list(second.context['page']), posts[10:])
+        back = self.follower_client.get(
+            f'{reverse("posts:follow_index")}?'
+            f'{second.context["page"].previous_query}'
+        )
+        self.assertEqual(list(back.context['page']), posts[:10])
+
+    def test_rebuild_command(self):
+        Follow.objects.bulk_create(
+            [Follow(user=self.follower, author=self.author)]
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.follower, post=self.post
+            ).exists()
+        )
@@ -1,14 +1,19 @@
 import shutil
 import tempfile
+from datetime import timedelta
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
-from posts.models import Post, Group, User
+from posts.buffers import flush_all
+from posts.models import Comment, Post, Group, User
+from posts.paginators import encode_cursor
 
 
 class PostPagesTests(TestCase):
@@ -263,6 +268,40 @@ class PaginatorViewsTest(TestCase):
                              expected_object.pub_date)
             self.assertEqual(page_object.views, expected_object.views)
 
+    def test_keyset_navigation(self):
+        first_page = self.client.get(reverse('posts:index')).context['page']
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        older_page = self.client.get(
+            reverse('posts:index') + '?' + first_page.next_query
+        ).context['page']
+        self.assertEqual(len(older_page), 3)
+        self.assertFalse(older_page.has_next())
+        self.assertEqual(older_page[0], self.post[2])
+        newer_page = self.client.get(
+            reverse('posts:index') + '?' + older_page.previous_query
+        ).context['page']
+        self.assertEqual(list(newer_page), list(first_page))
+        self.assertFalse(newer_page.has_previous())
+
+    def test_cursor_past_the_end_falls_back_to_first_page(self):
+        oldest = Post(pk=1, pub_date=self.post[0].pub_date - timedelta(1))
+        response = self.client.get(
+            reverse('posts:index'), {'after': encode_cursor(oldest)}
+        )
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page']
+        self.assertEqual(list(page), self.post[:2:-1])
+        self.assertFalse(page.has_previous())
+
+    def test_pages_past_offset_limit_are_not_found(self):
+        response = self.client.get(reverse('posts:index'), {'page': 9})
+        self.assertEqual(response.status_code, 404)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?after=broken')
+        self.assertEqual(len(response.context['page']), 10)
+
 
 class CacheIndexPageTest(TestCase):
     @classmethod
@@ -346,3 +385,74 @@ class FollowViewsTest(TestCase):
         )
         response = self.author_client.get(reverse('posts:follow_index'))
         self.assertEqual((len(page_object)), 0)
+
+
+@override_settings(
+    PAGE_HITS={'FLUSH_SIZE': 1000, 'FLUSH_INTERVAL': 3600},
+    POST_VIEWS={'FLUSH_SIZE': 1000, 'FLUSH_INTERVAL': 3600},
+)
+class FeedQueryCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='posts_author')
+        cls.follower = User.objects.create(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+
+    def setUp(self):
+        flush_all()
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+        self.follower_client.get(reverse('posts:profile_follow',
+                                 kwargs={'username': self.author.username}))
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text='Пост №' + str(i),
+                author=self.author,
+                group=self.group,
+            )
+            Comment.objects.create(
+                post=post, author=self.follower, text='Комментарий'
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.follower_client.get(url)
+        return len(queries)
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_slug', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+        )
+        self.create_posts(1)
+        single = {url: self.count_queries(url) for url in urls}
+        self.create_posts(9)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), single[url])
+
+    def test_feed_posts_are_annotated_with_comment_count(self):
+        self.create_posts(1)
+        response = self.follower_client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page'][0].comment_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_comment_count_does_not_group_the_feed(self):
+        self.create_posts(1)
+        Post.objects.create(text='Без комментариев', author=self.author)
+        feed = Post.objects.for_feed().order_by('-pub_date')
+        self.assertEqual([post.comment_count for post in feed], [0, 1])
+        # Комментарии считаются подзапросом по строкам страницы
+        self.assertNotIn('GROUP BY "posts_post"', str(feed.query))
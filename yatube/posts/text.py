@@ -0,0 +1,68 @@
+import html
+import re
+
+excerpt_length = 200
+
+comment = re.compile(r'<!--.*?-->', re.S)
+hidden = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.I | re.S)
+block = re.compile(
+    r'<\s*(?:br|/?(?:p|div|li|ul|ol|h[1-6]|tr|blockquote|pre|table))\b'
+    r'[^>]*>',
+    re.I,
+)
+tag = re.compile(r'<[^>]*>')
+spaces = re.compile(r'[^\S\n]+')
+newlines = re.compile(r' *\n[\s]*')
+
+
+def html_to_text(value):
+    """Текст HTML без разметки: блоки разделены переводами строк."""
+    if not value:
+        return ''
+    if '<' in value:
+        value = comment.sub('', value)
+        value = hidden.sub('', value)
+        value = block.sub('\n', value)
+        value = tag.sub('', value)
+    if '&' in value:
+        value = html.unescape(value)
+    value = spaces.sub(' ', value)
+    return newlines.sub('\n', value).strip()
+
+
+def make_excerpt(text, length=excerpt_length):
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0]
+    return cut.rstrip(',.;:!?-—') + '…'
+
+
+def fill_plain_text(instance, update_fields=None):
+    """Заполняет text_plain и excerpt перед сохранением модели.
+
+    Возвращает update_fields с добавленными полями, если он передан.
+    """
+    instance.text_plain = html_to_text(instance.text)
+    instance.excerpt = make_excerpt(instance.text_plain)
+    if update_fields is not None and 'text' in update_fields:
+        update_fields = {*update_fields, 'text_plain', 'excerpt'}
+    return update_fields
+
+
+def backfill(queryset, batch_size=500):
+    """Пересчитывает text_plain и excerpt у объектов пачками."""
+    model = queryset.model
+    batch = []
+    updated = 0
+    for obj in queryset.only('pk', 'text').iterator(chunk_size=batch_size):
+        fill_plain_text(obj)
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, ['text_plain', 'excerpt'])
+            updated += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ['text_plain', 'excerpt'])
+        updated += len(batch)
+    return updated
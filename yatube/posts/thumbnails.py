@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from yatube.routers import use_primary
+
+from . import conditional
+
+logger = logging.getLogger(__name__)
+
+defaults = {
+    # Первый размер - основной (src), остальные попадают в srcset
+    'SIZES': ('930x339', '690x252', '450x164'),
+    'WORKERS': 2,
+    'ASYNC': True,
+    # Сколько секунд помнить, что миниатюры еще нет: за это время её успеют
+    # создать, и следующая загрузка страницы её найдет
+    'MISSING_TIMEOUT': 60,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def options():
+    return {**defaults, **getattr(settings, 'THUMBNAILS', {})}
+
+
+class PregeneratedBackend(ThumbnailBackend):
+    """Бэкенд sorl, умеющий найти готовую миниатюру, не создавая её."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, который создал бы ``get_thumbnail``."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_existing(self, file_, geometry_string, **options):
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options)
+        )
+
+
+backend = PregeneratedBackend()
+
+
+def prefetch(images, sizes):
+    """Загружает записи kv-store sorl о миниатюрах одним запросом.
+
+    Без этого sorl ищет каждую миниатюру отдельным запросом, как только
+    её нет в кеше: после перезапуска или в новом процессе это запрос на
+    каждую карточку страницы.
+    """
+    keys = [
+        add_prefix(backend.thumbnail_file(image, size).key)
+        for image in images if image
+        for size in sizes
+    ]
+    if not keys:
+        return
+    kv_cache = default.kvstore.cache
+    cached = kv_cache.get_many(keys)
+    missing = [key for key in keys if key not in cached]
+    if not missing:
+        return
+    found = dict(
+        KVStore.objects.filter(key__in=missing).values_list('key', 'value')
+    )
+    kv_cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+    kv_cache.set_many(
+        {key: EMPTY_VALUE for key in missing if key not in found},
+        options()['MISSING_TIMEOUT'],
+    )
+
+
+def prefetch_posts(posts):
+    prefetch([post.image for post in posts], options()['SIZES'])
+
+
+def responsive_key(image):
+    digest = hashlib.md5(
+        repr((image.name, options()['SIZES'])).encode()
+    ).hexdigest()
+    return f'thumbnails:{digest}'
+
+
+def build_responsive(thumbnails):
+    widths = {}
+    for thumbnail in thumbnails:
+        widths.setdefault(thumbnail.width, thumbnail.url)
+    return {
+        'src': thumbnails[0].url,
+        'srcset': ', '.join(
+            f'{url} {width}w' for width, url in sorted(widths.items())
+        ),
+    }
+
+
+def generate(image):
+    thumbnails = [
+        backend.get_thumbnail(image, size) for size in options()['SIZES']
+    ]
+    responsive = build_responsive(thumbnails)
+    cache.set(responsive_key(image), responsive, timeout=None)
+    return responsive
+
+
+def responsive(image):
+    """Готовые миниатюры картинки: ``{'src': ..., 'srcset': ...}``.
+
+    Картинка никогда не обрабатывается во время запроса: пока миниатюры
+    не созданы, отдаётся оригинал без srcset.
+    """
+    if not image:
+        return None
+    key = responsive_key(image)
+    result = cache.get(key)
+    if result is not None:
+        return result
+    thumbnails = []
+    for size in options()['SIZES']:
+        thumbnail = backend.get_existing(image, size)
+        if not thumbnail:
+            return {'src': image.url, 'srcset': ''}
+        thumbnails.append(thumbnail)
+    result = build_responsive(thumbnails)
+    cache.set(key, result, timeout=None)
+    return result
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=options()['WORKERS'],
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def run_in_worker(image, post_id):
+    try:
+        with use_primary():
+            generate(image)
+            conditional.touch_posts([post_id])
+        return True
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image.name)
+        return False
+    finally:
+        # У каждого потока пула своё соединение с базой (kv-store sorl)
+        connection.close()
+
+
+def schedule(post):
+    """Создаёт миниатюры картинки поста после коммита транзакции."""
+    if not post.image:
+        return
+    image, post_id = post.image, post.pk
+    if options()['ASYNC']:
+        transaction.on_commit(
+            lambda: get_executor().submit(run_in_worker, image, post_id)
+        )
+    else:
+        transaction.on_commit(lambda: generate(image))
@@ -0,0 +1,153 @@
+from django.conf import settings
+
+from . import stats
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import keyset
+
+defaults = {
+    'MATERIALIZED': False,
+    'FANOUT_LIMIT': 1000,
+    'BATCH_SIZE': 500,
+}
+
+
+def options():
+    return {**defaults, **getattr(settings, 'FOLLOW_FEED', {})}
+
+
+def is_materialized():
+    return options()['MATERIALIZED']
+
+
+def follower_count(author_id):
+    followers = UserStats.objects.filter(
+        pk=author_id
+    ).values_list('followers', flat=True).first()
+    if followers is None:
+        author_stats = stats.recount(author_id)
+        followers = author_stats.followers if author_stats else 0
+    return followers
+
+
+def fans_out(author_id):
+    # Посты авторов с огромным числом подписчиков не раскладываются по
+    # лентам, а подмешиваются при чтении
+    return follower_count(author_id) <= options()['FANOUT_LIMIT']
+
+
+def celebrities(user):
+    return Follow.objects.filter(
+        user=user, author__stats__followers__gt=options()['FANOUT_LIMIT']
+    ).values('author')
+
+
+def create_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=options()['BATCH_SIZE'], ignore_conflicts=True
+    )
+
+
+def backfill(user_id, authors):
+    posts = Post.objects.filter(
+        author__in=authors
+    ).values_list('pk', 'pub_date')
+    create_entries([
+        TimelineEntry(user_id=user_id, post_id=post, pub_date=pub_date)
+        for post, pub_date in posts.iterator()
+    ])
+
+
+def fan_out_post(post):
+    if not is_materialized() or not fans_out(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id
+    ).values_list('user_id', flat=True)
+    create_entries([
+        TimelineEntry(user_id=user, post=post, pub_date=post.pub_date)
+        for user in followers.iterator()
+    ])
+
+
+def add_author(user_id, author_id):
+    """Раскладывает посты автора в ленту нового подписчика.
+
+    Если с этой подпиской автор перешел порог ``FANOUT_LIMIT``, его
+    посты убираются из всех лент: дальше они читаются по запросу.
+    """
+    if not is_materialized():
+        return
+    followers = follower_count(author_id)
+    if followers <= options()['FANOUT_LIMIT']:
+        backfill(user_id, [author_id])
+    elif followers == options()['FANOUT_LIMIT'] + 1:
+        TimelineEntry.objects.filter(post__author=author_id).delete()
+
+
+def remove_author(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося.
+
+    Если автор опустился до ``FANOUT_LIMIT`` подписчиков, его посты
+    раскладываются по лентам всех оставшихся подписчиков.
+    """
+    if not is_materialized():
+        return
+    TimelineEntry.objects.filter(user=user_id, post__author=author_id).delete()
+    if follower_count(author_id) == options()['FANOUT_LIMIT']:
+        followers = Follow.objects.filter(
+            author=author_id
+        ).values_list('user_id', flat=True)
+        for follower in followers.iterator():
+            backfill(follower, [author_id])
+
+
+def rebuild_timeline(user):
+    TimelineEntry.objects.filter(user=user).delete()
+    authors = Follow.objects.filter(user=user).exclude(
+        author__stats__followers__gt=options()['FANOUT_LIMIT']
+    ).values('author')
+    backfill(user.pk, authors)
+
+
+class TimelineFeed:
+    """Материализованная лента подписок.
+
+    Записи ленты и посты популярных авторов читаются по ключу (pub_date,
+    id) двумя запросами с ограничением и сливаются в памяти.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def queries(self, after=None, before=None, limit=None):
+        entries = TimelineEntry.objects.filter(user=self.user)
+        posts = Post.objects.filter(author__in=celebrities(self.user))
+        if after is not None or before is not None:
+            entries = entries.filter(keyset(after, before, pk='post_id'))
+            posts = posts.filter(keyset(after, before))
+        entries = entries.order_by('-pub_date', '-post_id')
+        posts = posts.order_by('-pub_date', '-id')
+        if before is not None:
+            entries, posts = entries.reverse(), posts.reverse()
+        return [
+            ('записи ленты',
+             entries.values_list('pub_date', 'post_id')[:limit]),
+            ('популярные авторы', posts.values_list('pub_date', 'id')[:limit]),
+        ]
+
+    def window(self, after=None, before=None, offset=0, limit=None):
+        end = None if limit is None else offset + limit
+        keys = set()
+        for _, queryset in self.queries(after, before, end):
+            keys.update(queryset)
+        keys = sorted(keys, reverse=before is None)[offset:end]
+        posts = Post.objects.for_feed().in_bulk([pk for _, pk in keys])
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+
+def follow_feed(user):
+    """Лента подписок: запрос к постам или ``TimelineFeed``, если ленты
+    материализованы. Оба варианта принимает ``paginate_feed``."""
+    if not is_materialized():
+        return Post.objects.filter(author__following__user=user).for_feed()
+    return TimelineFeed(user)
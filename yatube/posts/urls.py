@@ -9,6 +9,8 @@ urlpatterns = [
      path("group/<slug:slug>/", views.group_posts, name="group_slug"),
      path("new/", views.new_post, name="new_post"),
      path("follow/", views.follow_index, name="follow_index"),
+     path("search/", views.search, name="search"),
+     path("statistics/", views.statistics, name="statistics"),
      path("<str:username>/", views.profile, name="profile"),
      path("<str:username>/<int:post_id>/", views.post_view, name="post"),
      path("<str:username>/<int:post_id>/edit/", views.post_edit,
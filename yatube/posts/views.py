@@ -1,60 +1,67 @@
-from django.core.paginator import Paginator
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 from django.http import HttpResponseRedirect
 
-from .models import Follow, Post, Group, User, Ip
+from .models import Follow, Post, Group, User
 from .forms import CommentForm, PostForm
-from .decorators import counted
+from . import analytics, conditional, thumbnails
+from .decorators import (cache_per_session, conditional_page, counted,
+                         records_post_view)
+from .paginators import paginate_feed, paginate_ranked
+from .search import search_ids
+from .stats import for_user
+from .timeline import follow_feed
 
 paginator_pages = 10
 
 
-def get_client_ip(request):
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
-
-
-# @cache_page(5)
 @counted
+@conditional_page(conditional.index_validators)
+@cache_per_session(5)
 def index(request):
-    latest = Post.objects.select_related('author', 'group').prefetch_related(
-        'comments', 'views')
-    paginator = Paginator(latest, paginator_pages)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    latest = Post.objects.for_feed()
+    page = paginate_feed(request, latest, paginator_pages)
+    thumbnails.prefetch_posts(page)
     return render(request, 'index.html', {'page': page})
 
 
 @counted
+@conditional_page(conditional.group_validators)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.select_related('author').prefetch_related(
-        'comments', 'views')
-    paginator = Paginator(posts, paginator_pages)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = group.group_posts.for_feed()
+    page = paginate_feed(request, posts, paginator_pages)
+    thumbnails.prefetch_posts(page)
     return render(request, 'group.html', {'group': group, 'page': page})
 
 
 @counted
+def search(request):
+    query = request.GET.get('q', '').strip()
+    ids = search_ids('post', query) if query else []
+    page = paginate_ranked(request, Post.objects.for_feed(), ids,
+                           paginator_pages)
+    thumbnails.prefetch_posts(page)
+    return render(request, 'search.html', {'query': query, 'page': page})
+
+
+@counted
+@conditional_page(conditional.profile_validators)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group').prefetch_related(
-        'comments', 'views')
-    paginator = Paginator(posts, paginator_pages)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.for_feed()
+    page = paginate_feed(request, posts, paginator_pages)
+    thumbnails.prefetch_posts(page)
     following = None
     if request.user.is_authenticated:
         following = author.following.filter(user=request.user).exists()
     context = {
         'author': author,
+        'stats': for_user(author),
         'page': page,
         'following': following,
     }
@@ -62,19 +69,23 @@ def profile(request, username):
 
 
 @counted
+@records_post_view
+@conditional_page(conditional.post_validators)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__stats'),
+        author__username=username, id=post_id,
+    )
+    thumbnails.prefetch_posts([post])
     comments = post.comments.select_related('author')
     author = post.author
     form = CommentForm()
-    ip = get_client_ip(request)
-    Ip.objects.get_or_create(ip=ip)
-    post.views.add(Ip.objects.get(ip=ip))
     following = None
     if request.user.is_authenticated:
         following = author.following.filter(user=request.user).exists()
     context = {
         'author': author,
+        'stats': for_user(author),
         'post': post,
         'form': form,
         'comments': comments,
@@ -84,6 +95,7 @@ def post_view(request, username, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, author__username=username, id=post_id)
     form = CommentForm(request.POST or None)
@@ -96,6 +108,7 @@ def add_comment(request, username, post_id):
 
 
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -133,19 +146,35 @@ def post_edit(request, username, post_id):
     return render(request, 'new_post.html', context)
 
 
+@staff_member_required
+def statistics(request):
+    days, hours = analytics.parse_span(request.GET)
+    report = analytics.report(days, hours)
+    posts = Post.objects.select_related('author').in_bulk(
+        [post_id for post_id, _ in report['posts']]
+    )
+    context = {
+        'days': days,
+        'hours': hours,
+        'urls': report['urls'],
+        'posts': [
+            (posts[post_id], count) for post_id, count in report['posts']
+            if post_id in posts
+        ],
+    }
+    return render(request, 'statistics.html', context)
+
+
 @login_required
 @counted
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author', 'group').prefetch_related('comments')
-    paginator = Paginator(posts, paginator_pages)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate_feed(request, follow_feed(request.user), paginator_pages)
+    thumbnails.prefetch_posts(page)
     return render(request, 'follow.html', {'page': page})
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     if request.user.username == username:
         return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
@@ -155,6 +184,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
@@ -162,6 +192,7 @@ def profile_unfollow(request, username):
 
 
 @login_required
+@transaction.atomic
 def post_delete(request, username, post_id):
     if request.user.username != username:
         return redirect('posts:post', username, post_id)
@@ -5,6 +5,13 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Первые сегменты адресов сайта: профиль с таким именем был бы закрыт
+# страницей, которая стоит в urls раньше маршрута "<username>/"
+reserved_usernames = {
+    'about', 'admin', 'api', 'auth', 'follow', 'group', 'new', 'search',
+    'statistics', 'tinymce',
+}
+
 
 class CreationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -12,3 +19,11 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ("first_name", "last_name", "username", "email")
+
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if username.lower() in reserved_usernames:
+            raise forms.ValidationError(
+                'Это имя занято адресом сайта, выберите другое'
+            )
+        return username
@@ -0,0 +1,212 @@
+import os
+import threading
+from collections import Counter, defaultdict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(Counter)
+
+_missing = object()
+
+
+def cache_stats():
+    with _stats_lock:
+        aliases = {alias: dict(counter) for alias, counter in _stats.items()}
+    for counter in aliases.values():
+        lookups = counter.get('hits', 0) + counter.get('misses', 0)
+        counter['hit_ratio'] = (
+            round(counter.get('hits', 0) / lookups, 4) if lookups else None
+        )
+    return {'pid': os.getpid(), 'caches': aliases}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class InstrumentedCache(BaseCache):
+    """Обёртка над другим кешем из CACHES, считающая попадания и промахи.
+
+    LOCATION - имя кеша, которому передаются все операции.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.target_alias = location
+        self.stats_name = params.get('OPTIONS', {}).get('NAME', location)
+
+    @cached_property
+    def target(self):
+        return caches[self.target_alias]
+
+    def record(self, **counts):
+        with _stats_lock:
+            _stats[self.stats_name].update(counts)
+
+    def get(self, key, default=None, version=None):
+        value = self.target.get(key, _missing, version=version)
+        if value is _missing:
+            self.record(misses=1)
+            return default
+        self.record(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self.target.get_many(keys, version=version)
+        self.record(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.record(sets=1)
+        return self.target.add(key, value, timeout, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.record(sets=1)
+        self.target.set(key, value, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.record(sets=len(data))
+        return self.target.set_many(data, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.target.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.record(deletes=1)
+        self.target.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.record(deletes=len(keys))
+        self.target.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.target.has_key(key, version=version)  # noqa: W601
+
+    def incr(self, key, delta=1, version=None):
+        return self.target.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self.target.decr(key, delta, version=version)
+
+    def clear(self):
+        self.target.clear()
+
+    def close(self, **kwargs):
+        self.target.close(**kwargs)
+
+
+class TieredCache(InstrumentedCache):
+    """Двухуровневый кеш: локальный кеш процесса перед общим.
+
+    Значения из общего кеша (LOCATION) копируются в локальный
+    (OPTIONS['LOCAL']) на OPTIONS['LOCAL_TIMEOUT'] секунд, поэтому
+    изменения из других процессов видны с задержкой не больше этого
+    времени. Все записи идут в оба уровня.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        options = params.get('OPTIONS', {})
+        self.local_alias = options.get('LOCAL', 'local')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+
+    @cached_property
+    def local(self):
+        return caches[self.local_alias]
+
+    def get_local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.target.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(self.local_timeout, timeout)
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(key, _missing, version=version)
+        if value is not _missing:
+            self.record(hits=1, local_hits=1)
+            return value
+        value = self.target.get(key, _missing, version=version)
+        if value is _missing:
+            self.record(misses=1)
+            return default
+        self.record(hits=1)
+        self.local.set(key, value, self.local_timeout, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self.local.get_many(keys, version=version)
+        missing = [key for key in keys if key not in values]
+        self.record(local_hits=len(values))
+        if missing:
+            shared = self.target.get_many(missing, version=version)
+            if shared:
+                self.local.set_many(
+                    shared, self.local_timeout, version=version
+                )
+            values.update(shared)
+        self.record(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = super().add(key, value, timeout, version=version)
+        if added:
+            self.local.set(
+                key, value, self.get_local_timeout(timeout), version=version
+            )
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, timeout, version=version)
+        self.local.set(
+            key, value, self.get_local_timeout(timeout), version=version
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = super().set_many(data, timeout, version=version)
+        self.local.set_many(
+            data, self.get_local_timeout(timeout), version=version
+        )
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(key, version=version)
+        return super().touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version=version)
+        super().delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.local.delete_many(keys, version=version)
+        super().delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return (
+            self.local.has_key(key, version=version)  # noqa: W601
+            or super().has_key(key, version=version)
+        )
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(key, version=version)
+        return super().incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.local.delete(key, version=version)
+        return super().decr(key, delta, version=version)
+
+    def clear(self):
+        self.local.clear()
+        super().clear()
+
+    def close(self, **kwargs):
+        self.local.close(**kwargs)
+        super().close(**kwargs)
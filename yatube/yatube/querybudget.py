@@ -0,0 +1,119 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+in_list = re.compile(r'IN \((?:%s, )*%s\)')
+
+defaults = {
+    'ENABLED': True,
+    'RAISE': False,
+    'DEFAULT': None,
+    'MAX_DUPLICATES': None,
+    'VIEWS': {},
+}
+
+
+def options():
+    return {**defaults, **getattr(settings, 'QUERY_BUDGETS', {})}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    return in_list.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.monotonic() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {
+            sql: count for sql, count in self.fingerprints.items()
+            if count > 1
+        }
+
+    def check(self, view_name, budget):
+        if isinstance(budget, int):
+            budget = {'queries': budget}
+        budget = {
+            'queries': options()['DEFAULT'],
+            'duplicates': options()['MAX_DUPLICATES'],
+            **(budget or {}),
+        }
+        errors = []
+        if budget['queries'] is not None and self.count > budget['queries']:
+            errors.append(
+                f'{self.count} запросов при бюджете {budget["queries"]}'
+            )
+        duplicates = sum(count - 1 for count in self.duplicates.values())
+        if (budget['duplicates'] is not None
+                and duplicates > budget['duplicates']):
+            errors.append(
+                f'{duplicates} повторных запросов при бюджете '
+                f'{budget["duplicates"]}: {list(self.duplicates)}'
+            )
+        if errors:
+            return f'{view_name}: ' + '; '.join(errors)
+        return None
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы к базе, их время и повторы для каждого view.
+
+    Бюджеты задаются в ``QUERY_BUDGETS['VIEWS']`` по имени url
+    (``'posts:index'``): число запросов или словарь с ключами
+    ``queries`` и ``duplicates``. При превышении бюджета пишет
+    предупреждение в лог, а с ``RAISE`` бросает исключение.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not options()['ENABLED']:
+            return self.get_response(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else request.path
+        logger.debug(
+            '%s %s: %d запросов, %.1f мс', request.method, view_name,
+            recorder.count, recorder.duration * 1000,
+        )
+        error = recorder.check(view_name, options()['VIEWS'].get(view_name))
+        if error:
+            if options()['RAISE']:
+                raise QueryBudgetExceeded(error)
+            logger.warning(error)
+        return response
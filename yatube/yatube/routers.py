@@ -0,0 +1,128 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+defaults = {
+    'ALIASES': [],
+    'STICKY_SECONDS': 10,
+    'COOKIE_NAME': 'db_primary',
+    # Записи, после которых клиенту не нужно читать с основной базы
+    'UNTRACKED_MODELS': ['sessions.session'],
+}
+
+_state = threading.local()
+
+
+def options():
+    return {**defaults, **getattr(settings, 'DATABASE_REPLICAS', {})}
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def unpin():
+    _state.pinned = _state.wrote = False
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока идут в основную базу.
+
+    Нужен фоновым задачам, которые читают только что записанные данные:
+    реплика могла их еще не получить. Записи внутри блока не закрепляют
+    текущего клиента за основной базой.
+    """
+    previous = is_pinned(), getattr(_state, 'wrote', False)
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned, _state.wrote = previous
+
+
+class ReadWriteRouter:
+    """Чтения идут в соединение только для чтения, записи - в default.
+
+    Внутри транзакции на default чтения остаются на нем: иначе запрос не
+    увидел бы еще не зафиксированных изменений.
+    """
+    read_alias = 'reader'
+    write_alias = 'default'
+
+    def db_for_read(self, model, **hints):
+        if connections[self.write_alias].in_atomic_block:
+            return self.write_alias
+        return self.read_alias
+
+    def db_for_write(self, model, **hints):
+        return self.write_alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Оба соединения открывают одну и ту же базу
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.write_alias
+
+
+class ReplicaRouter(ReadWriteRouter):
+    """Чтения со случайной реплики из ``DATABASE_REPLICAS['ALIASES']``.
+
+    Запрос читает с основной базы, если он не GET и не HEAD, если клиент
+    недавно писал (cookie ``COOKIE_NAME`` от ``ReplicaMiddleware``), если
+    в этом же потоке уже была запись или если объект, от которого идет
+    запрос, сам загружен из основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        aliases = options()['ALIASES']
+        if is_pinned() or not aliases:
+            return self.write_alias
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == self.write_alias:
+            return self.write_alias
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        if model is not None and (
+            model._meta.label_lower not in options()['UNTRACKED_MODELS']
+        ):
+            # Дальше запрос читает то, что сам записал
+            _state.pinned = _state.wrote = True
+        return self.write_alias
+
+
+class ReplicaMiddleware:
+    """Закрепляет клиента за основной базой после его записей.
+
+    Чтобы пользователь сразу увидел свой пост или комментарий, после
+    запроса с записью ставится cookie на ``STICKY_SECONDS`` секунд, и
+    пока она жива, все чтения этого клиента идут в основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = options()
+        unpin()
+        _state.pinned = (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            or config['COOKIE_NAME'] in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            unpin()
+        if wrote:
+            response.set_cookie(
+                config['COOKIE_NAME'], '1',
+                max_age=config['STICKY_SECONDS'], httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -38,12 +38,55 @@ ALLOWED_HOSTS = [
     'pythonanywhere.com',
 ]
 
+# Кеш выбирается переменной окружения CACHE_BACKEND:
+# locmem - кеш внутри процесса (по умолчанию),
+# file - общий для всех воркеров файловый кеш в CACHE_LOCATION,
+# memcached - memcached, например на локальном сокете unix:/tmp/memcached.sock.
+# При CACHE_TIERED=True перед общим кешем ставится локальный кеш процесса
+# со временем жизни записей CACHE_LOCAL_TIMEOUT секунд.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+}
+CACHE_LOCATIONS = {
+    'locmem': 'shared',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'memcached': 'unix:/tmp/memcached.sock',
+}
+CACHE_TIERED = (
+    os.getenv('CACHE_TIERED', '') == 'True' and CACHE_BACKEND != 'locmem'
+)
+
 CACHES = {
     'default': {
+        'BACKEND': (
+            'yatube.cache.TieredCache' if CACHE_TIERED
+            else 'yatube.cache.InstrumentedCache'
+        ),
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'NAME': 'default',
+            'LOCAL': 'local',
+            'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', 5)),
+        },
+    },
+    'shared': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': (
+            os.getenv('CACHE_LOCATION') or CACHE_LOCATIONS[CACHE_BACKEND]
+        ),
+    },
+    'local': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'LOCATION': 'local',
+    },
 }
 
+if CACHE_BACKEND != 'locmem':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -56,6 +99,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'posts.apps.PostsConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -66,6 +110,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.querybudget.QueryBudgetMiddleware',
+    'yatube.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -109,12 +155,53 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# yatube.sqlite3 - SQLite с WAL и PRAGMA из SQLITE_PRAGMAS, транзакции
+# начинаются с BEGIN IMMEDIATE. При DATABASE_READ_SPLIT=True чтения
+# идут через отдельное соединение только для чтения.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
     }
 }
+DATABASE_ROUTERS = []
+if os.getenv('DATABASE_READ_SPLIT', '') == 'True':
+    DATABASES['reader'] = {
+        **DATABASES['default'],
+        'OPTIONS': {'read_only': True},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['yatube.routers.ReadWriteRouter']
+
+# Реплики для чтения: пути к копиям базы через запятую. GET-запросы
+# читают со случайной реплики, записи идут в default. Клиент, который
+# что-то записал, STICKY_SECONDS секунд читает с default (cookie
+# COOKIE_NAME), чтобы сразу увидеть свой пост или комментарий.
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': int(os.getenv('DATABASE_REPLICAS_STICKY_SECONDS', 10)),
+    'COOKIE_NAME': 'db_primary',
+}
+for number, path in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': path.strip(),
+        'OPTIONS': {'read_only': True},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS['ALIASES'].append(alias)
+if DATABASE_REPLICAS['ALIASES']:
+    DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+
+SQLITE_PRAGMAS = {
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64 * 1024)),
+}
 
 
 # Password validation
@@ -166,9 +253,9 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.EstimatedCountPagination',
     'PAGE_SIZE': 10,
 }
 
@@ -177,5 +264,155 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Пользователь из access-токена берется из кеша, а не из базы. Кеш
+# сбрасывается при изменении пользователя и отзыве токена.
+JWT_USER_CACHE = {
+    'TIMEOUT': int(os.getenv('JWT_USER_CACHE_TIMEOUT', 5 * 60)),
+}
+
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'^/api/.*$'
+
+# Счётчик переходов копит инкременты в памяти ('memory') или в общем
+# кеше ('cache') и пишет их в базу пачками.
+PAGE_HITS = {
+    'BACKEND': os.getenv('PAGE_HITS_BACKEND', 'memory'),
+    'FLUSH_INTERVAL': int(os.getenv('PAGE_HITS_FLUSH_INTERVAL', 10)),
+    'FLUSH_SIZE': int(os.getenv('PAGE_HITS_FLUSH_SIZE', 100)),
+}
+
+# Уникальные просмотры постов: повторный просмотр с того же ip не
+# учитывается в течение DEDUP_TTL секунд, остальные пишутся пачками.
+POST_VIEWS = {
+    'BACKEND': os.getenv('POST_VIEWS_BACKEND', 'memory'),
+    'FLUSH_INTERVAL': int(os.getenv('POST_VIEWS_FLUSH_INTERVAL', 10)),
+    'FLUSH_SIZE': int(os.getenv('POST_VIEWS_FLUSH_SIZE', 100)),
+    'DEDUP_TTL': int(os.getenv('POST_VIEWS_DEDUP_TTL', 60 * 60)),
+}
+
+# Переходы и просмотры записываются как события: запрос кладет их в
+# очередь на QUEUE_SIZE событий, фоновый поток пишет журнал пачками, а
+# раз в ROLLUP_INTERVAL секунд переносит его в PAGE_HITS и POST_VIEWS.
+# При переполнении очереди OVERFLOW='drop' отбрасывает события, а
+# 'sample' заранее начинает писать каждое SAMPLE_EVERY-е с весом.
+# Без ENABLED события пишутся напрямую через буферы выше.
+ANALYTICS_EVENTS = {
+    'ENABLED': os.getenv('ANALYTICS_EVENTS', 'True') == 'True',
+    'QUEUE_SIZE': int(os.getenv('ANALYTICS_EVENTS_QUEUE_SIZE', 10000)),
+    'BATCH_SIZE': int(os.getenv('ANALYTICS_EVENTS_BATCH_SIZE', 500)),
+    'ROLLUP_INTERVAL': int(os.getenv('ANALYTICS_EVENTS_ROLLUP_INTERVAL', 10)),
+    'OVERFLOW': os.getenv('ANALYTICS_EVENTS_OVERFLOW', 'sample'),
+}
+
+# Статистика переходов и просмотров по часам и дням собирается из
+# журнала событий. Почасовые счетчики хранятся HOURLY_RETENTION_DAYS
+# дней, дневные - DAILY_RETENTION_DAYS, обработанные события -
+# EVENT_RETENTION_DAYS. Удаляет устаревшее
+# python manage.py rollup_events --compact (раз в сутки).
+STATISTICS = {
+    'HOURLY_RETENTION_DAYS': int(
+        os.getenv('STATISTICS_HOURLY_RETENTION_DAYS', 2)
+    ),
+    'DAILY_RETENTION_DAYS': int(
+        os.getenv('STATISTICS_DAILY_RETENTION_DAYS', 365)
+    ),
+    'EVENT_RETENTION_DAYS': int(
+        os.getenv('STATISTICS_EVENT_RETENTION_DAYS', 7)
+    ),
+}
+
+# Материализованная лента подписок: посты раскладываются по лентам
+# подписчиков при публикации, кроме авторов с числом подписчиков больше
+# FANOUT_LIMIT - их посты подмешиваются при чтении. После включения
+# выполните python manage.py rebuild_timelines.
+FOLLOW_FEED = {
+    'MATERIALIZED': os.getenv('FOLLOW_FEED_MATERIALIZED', '') == 'True',
+    'FANOUT_LIMIT': int(os.getenv('FOLLOW_FEED_FANOUT_LIMIT', 1000)),
+}
+
+# Загрузки больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во временный файл,
+# а не держатся в памяти. Картинки постов уменьшаются до MAX_SIDE по
+# большей стороне и пересохраняются в FORMAT без метаданных.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+IMAGE_UPLOADS = {
+    'MAX_SIDE': int(os.getenv('IMAGE_UPLOADS_MAX_SIDE', 1920)),
+    'MAX_BYTES': int(os.getenv('IMAGE_UPLOADS_MAX_BYTES', 10 * 1024 * 1024)),
+    'FORMAT': os.getenv('IMAGE_UPLOADS_FORMAT', 'WEBP'),
+}
+
+# Миниатюры картинок постов создаются пулом потоков после сохранения
+# поста, шаблоны получают готовые src и srcset. Для уже загруженных
+# картинок выполните python manage.py prewarm_thumbnails.
+THUMBNAILS = {
+    'SIZES': ('930x339', '690x252', '450x164'),
+    'WORKERS': int(os.getenv('THUMBNAIL_WORKERS', 2)),
+    'ASYNC': os.getenv('THUMBNAIL_ASYNC', 'True') == 'True',
+}
+
+# HTML постов и комментариев очищается один раз при сохранении. После
+# изменения HTML_SANITIZER выполните python manage.py resanitize_html.
+# По умолчанию используется белый список из posts/sanitizer.py.
+HTML_SANITIZER = {}
+
+# Полнотекстовый поиск по постам и комментариям. Fts5Backend работает
+# только с SQLite, для других баз есть posts.search.DatabaseBackend.
+SEARCH = {
+    'BACKEND': os.getenv('SEARCH_BACKEND', 'posts.search.Fts5Backend'),
+}
+
+# list и retrieve постов, групп и комментариев в API собираются из
+# .values() без сериализаторов и кодируются orjson, если он установлен.
+# Сравнить оба пути: python manage.py benchmark_fast_reads.
+API_FAST_READS = {
+    'ENABLED': os.getenv('API_FAST_READS', 'True') == 'True',
+}
+
+# ETag и Last-Modified для лент, страниц постов и API: считаются по
+# версиям данных в кеше без построения страницы. VERSION меняйте при
+# выкладке новых шаблонов.
+CONDITIONAL_GET = {
+    'ENABLED': os.getenv('CONDITIONAL_GET', 'True') == 'True',
+    'VERSION': os.getenv('CONDITIONAL_GET_VERSION', ''),
+}
+
+# Бюджеты запросов к базе по именам url: число запросов или словарь
+# {'queries': ..., 'duplicates': ...}. Превышение пишется в лог, а при
+# RAISE=True бросает исключение (так делают тесты).
+QUERY_BUDGETS = {
+    'RAISE': False,
+    'DEFAULT': None,
+    'MAX_DUPLICATES': 1,
+    'VIEWS': {
+        'posts:index': 16,
+        'posts:group_slug': 17,
+        'posts:new_post': 8,
+        'posts:follow_index': 16,
+        'posts:profile': 17,
+        'posts:post': 9,
+        'posts:post_edit': 7,
+        'posts:add_comment': 9,
+        'posts:post_delete': {'queries': 17, 'duplicates': 2},
+        'posts:profile_follow': 11,
+        'posts:search': 16,
+        'posts:statistics': 6,
+        'posts:profile_unfollow': {'queries': 11, 'duplicates': 2},
+        'api-root': 0,
+        'post-list': 8,
+        'post-detail': 13,
+        'post_comments-list': 7,
+        'post_comments-detail': 7,
+        'group-list': 4,
+        'group-detail': 2,
+        'user-list': 6,
+        'user-detail': 4,
+        'follow-list': 4,
+        'follow-detail': 3,
+        'follow-recent-white-cats': 4,
+        'token_obtain_pair': 2,
+        'token_refresh': 1,
+        'token_verify': 1,
+        'search': 4,
+        'cache_stats': 1,
+        'statistics': 2,
+    },
+}
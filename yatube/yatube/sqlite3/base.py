@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+defaults = {
+    # Читатели не ждут писателя, а писатель - читателей
+    'journal_mode': 'WAL',
+    # В режиме WAL fsync только при контрольной точке, данные не
+    # теряются при падении процесса, только при отключении питания
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в килобайтах, а не в страницах
+    'cache_size': -64 * 1024,
+    # Сколько миллисекунд ждать блокировки вместо "database is locked"
+    'busy_timeout': 5000,
+}
+
+
+def options():
+    return {**defaults, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с настройками для нескольких процессов.
+
+    При подключении выполняет PRAGMA из ``SQLITE_PRAGMAS``. Транзакции
+    начинаются с BEGIN IMMEDIATE: писатели выстраиваются в очередь на
+    время ``busy_timeout`` в начале транзакции, а не получают ошибку
+    блокировки посреди нее. ``OPTIONS['read_only']`` открывает базу только
+    для чтения.
+    """
+    read_only = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.read_only = params.pop('read_only', False)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = options()
+        if self.read_only:
+            # Режим журнала хранится в файле базы и меняется только
+            # писателем
+            pragmas.pop('journal_mode', None)
+            pragmas['query_only'] = 'ON'
+        for name, value in pragmas.items():
+            if value is not None:
+                conn.execute(f'PRAGMA {name} = {value}').fetchall()
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.read_only:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute('BEGIN IMMEDIATE')